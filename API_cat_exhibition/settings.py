@@ -30,11 +30,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "kittens.middleware.PerformanceMiddleware",
+    "kittens.middleware.ConcurrencyLimitMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Окно чтения с основной базы привязано к пользователю сессии или JWT
+    "kittens.middleware.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -63,9 +67,68 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Транзакция сразу берет блокировку записи и ждет ее busy_timeout,
+            # а не падает с "database is locked" при повышении блокировки
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
+# PostgreSQL для продакшена (нужен пакет psycopg[pool])
+if os.getenv("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER", "postgres"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Постоянное соединение проверяется перед повторным использованием
+        "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    # Пул соединений psycopg заменяет постоянные соединения Django
+    if os.getenv("POSTGRES_POOL_MAX_SIZE"):
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE")),
+            "timeout": int(os.getenv("POSTGRES_POOL_TIMEOUT", 10)),
+        }
+
+# Реплики для чтения: хосты PostgreSQL или файлы SQLite через запятую
+# (для локальной проверки DB_REPLICAS=db_replica1.sqlite3,db_replica2.sqlite3)
+DATABASE_ROUTERS = ["kittens.routers.PrimaryReplicaRouter"]
+KITTENS_REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1
+):
+    alias = f"replica{number}"
+    DATABASES[alias] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if DATABASES[alias]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[alias]["NAME"] = BASE_DIR / replica
+    else:
+        DATABASES[alias]["HOST"] = replica
+    KITTENS_REPLICA_DATABASES.append(alias)
+
+# Сколько секунд после записи пользователь читает с основной базы
+KITTENS_REPLICA_PIN_SECONDS = int(os.getenv("KITTENS_REPLICA_PIN_SECONDS", 5))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Общий кеш (например, локальный Redis) для нескольких процессов
+if os.getenv("REDIS_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL"),
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -95,17 +158,116 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "kittens.authentication.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "kittens.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "kittens.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    "DEFAULT_THROTTLE_CLASSES": ["kittens.throttling.ScopedTokenBucketThrottle"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 5,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Максимальный размер страницы при курсорной пагинации котиков (?page_size=)
+KITTENS_MAX_PAGE_SIZE = int(os.getenv("KITTENS_MAX_PAGE_SIZE", 500))
+
+# Максимальное число котиков в одном запросе массового создания
+KITTENS_BULK_MAX_ITEMS = int(os.getenv("KITTENS_BULK_MAX_ITEMS", 1000))
+
+# Размер пачки строк при потоковой выгрузке котиков
+KITTENS_EXPORT_CHUNK_SIZE = int(os.getenv("KITTENS_EXPORT_CHUNK_SIZE", 500))
+
+# Максимальное число котиков в рейтинге лучших
+KITTENS_LEADERBOARD_MAX_LIMIT = int(os.getenv("KITTENS_LEADERBOARD_MAX_LIMIT", 100))
+
+# Быстрая сериализация списка и карточки котика из строк values()
+KITTENS_FAST_SERIALIZATION = os.getenv("KITTENS_FAST_SERIALIZATION", "") == "1"
+
+# С какого числа строк админка показывает оценку размера таблицы вместо COUNT(*)
+KITTENS_ADMIN_ESTIMATED_COUNT_THRESHOLD = int(
+    os.getenv("KITTENS_ADMIN_ESTIMATED_COUNT_THRESHOLD", 100000)
+)
+
+# Байесовская средняя оценка: априорное среднее и его вес в числе оценок
+KITTENS_RATING_PRIOR_MEAN = float(os.getenv("KITTENS_RATING_PRIOR_MEAN", 3.0))
+KITTENS_RATING_PRIOR_WEIGHT = int(os.getenv("KITTENS_RATING_PRIOR_WEIGHT", 5))
+
+# Буферизованный прием оценок: POST /api/<id>/rate/ отвечает 202 после записи
+# в журнал на диске, а фоновый поток пишет оценки в базу пачками по размеру
+# или раз в интервал (секунды). Сверх MAX_PENDING оценок в очереди — ответ 503
+KITTENS_RATING_INGESTION = os.getenv("KITTENS_RATING_INGESTION", "") == "1"
+KITTENS_INGESTION_LOG_DIR = os.getenv(
+    "KITTENS_INGESTION_LOG_DIR", str(BASE_DIR / "ingestion")
+)
+KITTENS_INGESTION_BATCH_SIZE = int(os.getenv("KITTENS_INGESTION_BATCH_SIZE", 500))
+KITTENS_INGESTION_FLUSH_INTERVAL = float(
+    os.getenv("KITTENS_INGESTION_FLUSH_INTERVAL", 0.5)
+)
+KITTENS_INGESTION_MAX_PENDING = int(os.getenv("KITTENS_INGESTION_MAX_PENDING", 50000))
+# fsync журнала перед ответом; без него оценки могут потеряться при сбое ОС
+KITTENS_INGESTION_FSYNC = os.getenv("KITTENS_INGESTION_FSYNC", "1") == "1"
+
+# Кеш ответов на чтение котиков и пород
+KITTENS_CACHE_ALIAS = "default"
+KITTENS_CACHE_TIMEOUT = int(os.getenv("KITTENS_CACHE_TIMEOUT", 300))
+
+# PRAGMA для каждого нового соединения SQLite: журнал WAL позволяет читать
+# во время записи, busy_timeout (мс) задает ожидание блокировки записи
+KITTENS_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("KITTENS_SQLITE_BUSY_TIMEOUT", 5000)),
+}
+
+# Бюджеты числа SQL-запросов по именам URL: превышение пишется в лог
+# и в метрику kittens_query_budget_exceeded_total (признак N+1).
+# Запросы считаются в режиме autocommit, как их выполняет сервер
+KITTENS_QUERY_BUDGETS = {
+    "kitten_list_create": 3,
+    "kitten_detail_update_delete": 9,
+    "kitten_leaderboard": 1,
+    "kitten_bulk_create": 5,
+    "kitten_rate": 10,
+    "kitten_bulk_rate": 9,
+    "breed_list_create": 2,
+    "breed_stats": 2,
+    "async_kitten_list": 3,
+    "async_kitten_detail": 2,
+    "async_breed_list": 1,
+}
+KITTENS_QUERY_BUDGET_DEFAULT = int(os.getenv("KITTENS_QUERY_BUDGET_DEFAULT", 10))
+
+# Заголовок Server-Timing с временем обработки, SQL и рендеринга
+KITTENS_SERVER_TIMING = os.getenv("KITTENS_SERVER_TIMING", "1") == "1"
+
+# Ограничение частоты по throttle_scope представлений (запросов/s, m, h, d)
+# для пользователя или, без авторизации, для IP-адреса; None — без лимита
+KITTENS_THROTTLE_RATES = {
+    "kittens": os.getenv("KITTENS_THROTTLE_KITTENS", "600/min"),
+    "ratings": os.getenv("KITTENS_THROTTLE_RATINGS", "120/min"),
+    "token": os.getenv("KITTENS_THROTTLE_TOKEN", "20/min"),
+}
+KITTENS_THROTTLE_CACHE_ALIAS = "default"
+
+# Одновременных запросов на процесс, сверх — ответ 503; держите не больше
+# POSTGRES_POOL_MAX_SIZE. 0 — без ограничения
+KITTENS_MAX_CONCURRENT_REQUESTS = int(os.getenv("KITTENS_MAX_CONCURRENT_REQUESTS", 0))
+KITTENS_CONCURRENCY_EXEMPT_VIEWS = {"metrics"}
+
+# Токен для сбора метрик (Authorization: Bearer <токен>); пустой — без проверки
+KITTENS_METRICS_TOKEN = os.getenv("KITTENS_METRICS_TOKEN", "")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -119,8 +281,15 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
 }
 
+# Время жизни локального кеша проверок отзыва токенов (секунды) и его размер
+KITTENS_JWT_REVOCATION_CACHE_TTL = int(
+    os.getenv("KITTENS_JWT_REVOCATION_CACHE_TTL", 5)
+)
+KITTENS_JWT_REVOCATION_CACHE_SIZE = 10000
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "API Cat Exhibition",
     "DESCRIPTION": "Simple API for cat exhibition",
@@ -1,28 +1,155 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.utils.html import format_html
 
+from kittens import search
+from kittens.pagination import EstimatedCountPaginator
+
 from .models import Breed, Kitten, Rating
 
 
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех значений столбца"""
+
+    template = "admin/kittens/input_filter.html"
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or "").strip()
+        if not value:
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup: value})
+        except (ValueError, ValidationError) as e:
+            raise IncorrectLookupParameters(e)
+
+    def choices(self, changelist):
+        # Остальные параметры сохраняются скрытыми полями формы
+        yield {
+            "value": self.value() or "",
+            "hidden_params": [
+                (name, value)
+                for name, values in changelist.filter_params.items()
+                if name != self.parameter_name
+                for value in values
+            ],
+            "clear_query_string": changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+        }
+
+
+class ColorFilter(InputFilter):
+    title = "цвет"
+    parameter_name = "color"
+    lookup = "color"
+
+
+class OwnerFilter(InputFilter):
+    title = "владелец (логин)"
+    parameter_name = "owner"
+    lookup = "owner__username"
+
+
+class KittenIdFilter(InputFilter):
+    title = "котенок (id)"
+    parameter_name = "kitten"
+    lookup = "kitten_id"
+
+
+class UserFilter(InputFilter):
+    title = "пользователь (логин)"
+    parameter_name = "user"
+    lookup = "user__username"
+
+
+class AgeFilter(admin.SimpleListFilter):
+    """Фиксированные диапазоны возраста по индексу вместо DISTINCT по таблице"""
+
+    title = "возраст"
+    parameter_name = "age"
+    ranges = {
+        "0-3": (0, 3),
+        "4-6": (4, 6),
+        "7-12": (7, 12),
+        "13-": (13, None),
+    }
+
+    def lookups(self, request, model_admin):
+        return [
+            (key, f"{low}–{high} мес." if high else f"от {low} мес.")
+            for key, (low, high) in self.ranges.items()
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() not in self.ranges:
+            return queryset
+        low, high = self.ranges[self.value()]
+        if high is None:
+            return queryset.filter(age__gte=low)
+        return queryset.filter(age__range=(low, high))
+
+
+class RatingValueFilter(admin.SimpleListFilter):
+    """Оценки 1–5 без DISTINCT по таблице рейтингов"""
+
+    title = "рейтинг"
+    parameter_name = "rating"
+
+    def lookups(self, request, model_admin):
+        return [(value, str(value)) for value in range(1, 6)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(rating=self.value())
+        return queryset
+
+
 @admin.register(Breed)
 class BreedAdmin(admin.ModelAdmin):
     list_display = ("name",)
+    search_fields = ("name",)
 
 
 @admin.register(Kitten)
 class KittenAdmin(admin.ModelAdmin):
-    list_display = ("breed", "color", "age", "owner")
-    list_filter = ("breed", "color", "age")
+    list_display = ("id", "breed", "color", "age", "owner", "average_rating")
+    list_filter = ("breed", AgeFilter, ColorFilter, OwnerFilter)
+    list_select_related = ("breed", "owner")
+    autocomplete_fields = ("breed", "owner")
+    search_fields = ("description",)
+    search_help_text = "Поиск по словам в описании и цвете"
+    # Сортировка по первичному ключу не требует сортировки всей таблицы
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search.search(queryset, search_term), False
 
 
 @admin.register(Rating)
 class RatingAdmin(admin.ModelAdmin):
     list_display = ("id", "kitten_link", "user", "rating")
     list_display_links = ("id", "kitten_link")
-    list_filter = ("kitten", "user", "rating")
+    list_filter = (RatingValueFilter, KittenIdFilter, UserFilter)
+    list_select_related = ("kitten__breed", "user")
+    raw_id_fields = ("kitten", "user")
+    ordering = ("-id",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     @admin.display(description="Котенок")
     def kitten_link(self, obj):
-        url = reverse("admin:kittens_kitten_change", args=(obj.kitten.id,))
+        url = reverse("admin:kittens_kitten_change", args=(obj.kitten_id,))
         return format_html('<a href="{}">{}</a>', url, obj.kitten)
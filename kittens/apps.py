@@ -5,3 +5,6 @@ class KittensConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "kittens"
     verbose_name = "Котики"
+
+    def ready(self):
+        from kittens import signals  # noqa: F401
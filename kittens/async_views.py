@@ -0,0 +1,165 @@
+from functools import wraps
+from math import ceil
+
+from django.forms import ModelChoiceField
+from django.http import HttpResponse
+from django.utils.translation import gettext as _
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from kittens import breeds, throttling
+from kittens.middleware import token_user_id
+from kittens.models import Kitten, Rating
+from kittens.renderers import FastJSONRenderer
+from kittens.serializers import (BreedSerializer, KittenDetailRowSerializer,
+                                 KittenRowSerializer)
+
+renderer = FastJSONRenderer()
+
+# Параметры сокращенного списка котиков; фильтры, поиск, сортировка, курсор,
+# кеш ответов и ETag есть только у /api/
+KITTEN_LIST_PARAMS = {"breed", "page"}
+
+
+def json_response(data, status=200):
+    """Ответ с теми же байтами, что и у DRF-представлений"""
+    return HttpResponse(
+        renderer.render(data), status=status, content_type=renderer.media_type
+    )
+
+
+def throttle(scope):
+    """Ограничение частоты как у DRF-представлений с таким throttle_scope"""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # Пользователь берется только из JWT: сессия потребовала бы
+            # синхронного запроса к БД, поэтому без токена ключ — IP-адрес
+            user_id = token_user_id(request)
+            if user_id is None:
+                ident = f"ip:{BaseThrottle().get_ident(request)}"
+            else:
+                ident = f"user:{user_id}"
+            wait = throttling.take_scope(scope, ident)
+            if wait:
+                exc = Throttled(wait)
+                response = json_response({"detail": exc.detail}, status=exc.status_code)
+                response["Retry-After"] = str(exc.wait)
+                return response
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def page_link(request, page):
+    url = request.build_absolute_uri()
+    if page == 1:
+        return remove_query_param(url, "page")
+    return replace_query_param(url, "page", page)
+
+
+def page_number(request, count):
+    """Номер запрошенной страницы или None, если такой страницы нет"""
+    pages = max(1, ceil(count / api_settings.PAGE_SIZE))
+    page = request.GET.get("page", "1")
+    if not page.isdigit() or not 1 <= int(page) <= pages:
+        return None
+    return int(page)
+
+
+def invalid_page():
+    return json_response({"detail": _("Invalid page.")}, status=404)
+
+
+def page_response(request, page, count, results):
+    """Страница в формате PageNumberPagination"""
+    last = page * api_settings.PAGE_SIZE >= count
+    return json_response(
+        {
+            "count": count,
+            "next": None if last else page_link(request, page + 1),
+            "previous": page_link(request, page - 1) if page > 1 else None,
+            "results": results,
+        }
+    )
+
+
+async def paginate(request, queryset, serializer_class):
+    """Страница котиков с выборкой через async ORM"""
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    page = page_number(request, count)
+    if page is None:
+        return invalid_page()
+    start = (page - 1) * page_size
+    page_rows = queryset[start : start + page_size].aiterator(chunk_size=page_size)
+    rows = [row async for row in page_rows]
+    # В снимке справочника есть все породы страницы, поэтому сериализатор
+    # не обращается к БД из async-контекста
+    catalog = await breeds.aget_breeds({row["breed_id"] for row in rows})
+    data = serializer_class(rows, many=True, context={"breeds": catalog}).data
+    return page_response(request, page, count, data)
+
+
+@require_safe
+@throttle("kittens")
+async def kitten_list(request):
+    """Эндпоинт для замеров ASGI: страницы котиков и фильтр по породе"""
+    unsupported = sorted(set(request.GET) - KITTEN_LIST_PARAMS)
+    if unsupported:
+        # Молча пропущенный фильтр вернул бы лишних котиков
+        names = ", ".join(unsupported)
+        detail = f"Параметры не поддерживаются, используйте /api/: {names}"
+        return json_response({"detail": detail}, status=400)
+    queryset = Kitten.objects.order_by("id").values(*KittenRowSerializer.fields)
+    breed = request.GET.get("breed")
+    if breed:
+        breed_id = int(breed) if breed.isdigit() else None
+        if breed_id is None or breed_id not in await breeds.aget_breeds((breed_id,)):
+            message = ModelChoiceField.default_error_messages["invalid_choice"]
+            return json_response({"breed": [str(message)]}, status=400)
+        queryset = queryset.filter(breed_id=breed)
+    return await paginate(request, queryset, KittenRowSerializer)
+
+
+@require_safe
+@throttle("kittens")
+async def kitten_detail(request, pk):
+    try:
+        rows = Kitten.objects.values(*KittenDetailRowSerializer.fields)
+        row = await rows.aget(pk=pk)
+    except Kitten.DoesNotExist:
+        # Текст как у get_object_or_404 в DRF-представлении
+        detail = f"No {Kitten._meta.object_name} matches the given query."
+        return json_response({"detail": detail}, status=404)
+    # values_list().aiterator() в Django 5.1 выполняет запрос в async-контексте
+    ratings = Rating.objects.filter(kitten_id=pk).values("user__username", "rating")
+    row["ratings"] = [
+        (rating["user__username"], rating["rating"])
+        async for rating in ratings.aiterator()
+    ]
+    catalog = await breeds.aget_breeds((row["breed_id"],))
+    return json_response(
+        KittenDetailRowSerializer(row, context={"breeds": catalog}).data
+    )
+
+
+@require_safe
+@throttle("kittens")
+async def breed_list(request):
+    # Список пород отдается из справочника процесса без запросов к БД
+    catalog = list((await breeds.aget_breeds()).values())
+    page = page_number(request, len(catalog))
+    if page is None:
+        return invalid_page()
+    start = (page - 1) * api_settings.PAGE_SIZE
+    rows = catalog[start : start + api_settings.PAGE_SIZE]
+    return page_response(
+        request, page, len(catalog), BreedSerializer(rows, many=True).data
+    )
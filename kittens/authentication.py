@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication, JWTStatelessUserAuthentication)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from kittens import cache
+
+# Локальный кеш меток отзыва: user_id -> (действует до, время отзыва)
+_revocations = {}
+
+
+def _revocation_key(user_id):
+    return f"kittens:jwt:revoked:{user_id}"
+
+
+def revoke_tokens(user_id):
+    """Отзывает все токены пользователя, выпущенные до текущего момента"""
+    cache.cache.set(
+        _revocation_key(user_id),
+        time.time(),
+        settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"].total_seconds(),
+    )
+    _revocations.pop(user_id, None)
+
+
+def get_revoked_at(user_id):
+    """Возвращает время отзыва токенов пользователя с кешированием в процессе"""
+    now = time.monotonic()
+    entry = _revocations.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    if len(_revocations) >= settings.KITTENS_JWT_REVOCATION_CACHE_SIZE:
+        _revocations.clear()
+    revoked_at = cache.cache.get(_revocation_key(user_id))
+    _revocations[user_id] = (
+        now + settings.KITTENS_JWT_REVOCATION_CACHE_TTL,
+        revoked_at,
+    )
+    return revoked_at
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """JWT-аутентификация по подписанным claims без запроса пользователя из БД
+
+    Метки отзыва токенов хранятся в кеше. Кеш процесса не видит метки,
+    поставленные другими процессами, поэтому без общего кеша пользователь
+    читается из БД, как в JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if cache.is_shared():
+            user = super().get_user(validated_token)
+        else:
+            user = JWTAuthentication.get_user(self, validated_token)
+        revoked_at = get_revoked_at(user.id)
+        # Обновленный токен доступа копирует auth_time из токена обновления
+        issued_at = validated_token.get("auth_time", validated_token.get("iat", 0))
+        if revoked_at is not None and issued_at <= revoked_at:
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        return user
@@ -0,0 +1,74 @@
+import threading
+
+from asgiref.sync import sync_to_async
+
+from kittens import cache
+from kittens.models import Breed
+
+
+def _queryset():
+    return Breed.objects.only("id", "name").order_by("name")
+
+
+class BreedRegistry:
+    """Справочник пород в памяти процесса
+
+    Таблица пород читается одним запросом и хранится, пока не изменится
+    версия BREED_CATALOG в общем кеше. Сигналы сохранения и
+    удаления породы меняют версию, и каждый процесс перечитывает таблицу
+    при следующем обращении. Породы возвращаются словарем {id: Breed}
+    в порядке названий; словарь не изменяется после загрузки.
+    """
+
+    def __init__(self):
+        # Версия и породы заменяются вместе, чтобы читать их без блокировки
+        self._state = (None, {})
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, version, breeds, required):
+        return version == self._state[0] and all(pk in breeds for pk in required)
+
+    def get(self, required=()):
+        """Породы процесса; неизвестные id из required перечитывают таблицу
+
+        Порода, созданная другим процессом с локальным кешем, не меняет
+        версию в этом процессе, поэтому промах по id тоже загружает таблицу.
+        """
+        version = cache.get_version(cache.BREED_CATALOG)
+        breeds = self._state[1]
+        if self._is_fresh(version, breeds, required):
+            return breeds
+        with self._lock:
+            breeds = self._state[1]
+            if not self._is_fresh(version, breeds, required):
+                breeds = {breed.pk: breed for breed in _queryset()}
+                self._state = (version, breeds)
+        return breeds
+
+    async def aget(self, required=()):
+        """То же, что get(); загрузка идет в потоке под общей блокировкой
+
+        Одновременные запросы после смены версии ждут одну загрузку таблицы,
+        а не читают ее каждый.
+        """
+        version = cache.get_version(cache.BREED_CATALOG)
+        breeds = self._state[1]
+        if self._is_fresh(version, breeds, required):
+            return breeds
+        return await sync_to_async(self.get)(required)
+
+
+registry = BreedRegistry()
+
+
+def get_breeds(required=()):
+    return registry.get(required)
+
+
+async def aget_breeds(required=()):
+    return await registry.aget(required)
+
+
+def get_breed(pk):
+    """Порода по id или None, если ее нет"""
+    return get_breeds((pk,)).get(pk)
@@ -0,0 +1,161 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+from kittens import routers
+
+cache = caches[settings.KITTENS_CACHE_ALIAS]
+
+# Пространства имен кеша ответов
+BREEDS = "breeds"
+KITTENS = "kittens"
+# Версия справочника пород процесса; меняется только при изменении пород
+BREED_CATALOG = "breed_catalog"
+STATS_NAMESPACES = (BREEDS, KITTENS, "kitten")
+
+
+def is_shared():
+    """Кеш общий для процессов: записи одного процесса видны остальным"""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def kitten_namespace(kitten_id):
+    return f"kitten:{kitten_id}"
+
+
+def _version_key(namespace):
+    return f"kittens:version:{namespace}"
+
+
+def _version_timeout():
+    # Смена версии в локальном кеше не видна другим процессам: без срока
+    # жизни они отдавали бы старые ответы и 304 на старые ETag бессрочно
+    return None if is_shared() else settings.KITTENS_CACHE_TIMEOUT
+
+
+def get_version(namespace):
+    """Возвращает текущую версию пространства имен кеша"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Версия из времени не повторяет старые значения после вытеснения ключа
+        version = time.time_ns()
+        if not cache.add(key, version, _version_timeout()):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(*namespaces):
+    """Инвалидирует закешированные ответы пространств имен"""
+    version = time.time_ns()
+    cache.set_many(
+        {_version_key(namespace): version for namespace in namespaces},
+        _version_timeout(),
+    )
+
+
+def bump_version_on_commit(*namespaces, using=None):
+    """Инвалидирует ответы сейчас и еще раз после фиксации транзакции
+
+    Параллельный GET между изменением и фиксацией читает старые строки
+    и кеширует их под новой версией; повторная смена версии после
+    фиксации отбрасывает такой ответ.
+    """
+    bump_version(*namespaces)
+    transaction.on_commit(lambda: bump_version(*namespaces), using=using)
+
+
+def is_recent(version):
+    """Версия сменилась в окне, когда реплики могут не видеть запись"""
+    return time.time_ns() - version < settings.KITTENS_REPLICA_PIN_SECONDS * 10**9
+
+
+def response_cache_key(namespace, request, dependencies=()):
+    """Ключ ответа с версиями его пространства имен и зависимостей"""
+    query = "&".join(
+        f"{key}={value}"
+        for key, values in sorted(request.query_params.lists())
+        for value in values
+    )
+    url = request.build_absolute_uri(request.path)
+    digest = hashlib.md5(f"{url}?{query}".encode()).hexdigest()
+    versions = ":".join(str(get_version(name)) for name in (namespace, *dependencies))
+    return f"kittens:response:{namespace}:{versions}:{digest}"
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def record(namespace, hit):
+    namespace = namespace.split(":", 1)[0]
+    _incr(f"kittens:stats:{namespace}:{'hits' if hit else 'misses'}")
+
+
+def get_stats():
+    """Возвращает счетчики попаданий и промахов кеша ответов"""
+    keys = [
+        f"kittens:stats:{namespace}:{counter}"
+        for namespace in STATS_NAMESPACES
+        for counter in ("hits", "misses")
+    ]
+    values = cache.get_many(keys)
+    return {
+        namespace: {
+            counter: values.get(f"kittens:stats:{namespace}:{counter}", 0)
+            for counter in ("hits", "misses")
+        }
+        for namespace in STATS_NAMESPACES
+    }
+
+
+class CachedResponseMixin:
+    """Кеширует сериализованные ответы на GET-запросы"""
+
+    # Пространство имен кешированных ответов представления
+    cache_namespace = None
+    # Пространства имен, изменение которых тоже устаревает ответ
+    cache_dependencies = ()
+
+    def get_cache_namespace(self):
+        assert self.cache_namespace is not None, (
+            "'%s' should either include a `cache_namespace` attribute, "
+            "or override the `get_cache_namespace()` method." % self.__class__.__name__
+        )
+        return self.cache_namespace
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        namespace = self.get_cache_namespace()
+        key = response_cache_key(namespace, request, self.cache_dependencies)
+        data = cache.get(key)
+        if data is not None:
+            record(namespace, hit=True)
+            return Response(data)
+
+        record(namespace, hit=False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and not self.replica_may_lag(namespace):
+            cache.set(key, response.data, settings.KITTENS_CACHE_TIMEOUT)
+        return response
+
+    def replica_may_lag(self, namespace):
+        """Ответ прочитан с реплики, которая могла еще не получить запись
+
+        Такой ответ под новой версией жил бы в кеше до истечения таймаута.
+        """
+        if not routers.reads_from_replica():
+            return False
+        return any(
+            is_recent(get_version(name))
+            for name in (namespace, *self.cache_dependencies)
+        )
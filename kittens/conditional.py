@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from kittens import cache
+from kittens.models import Kitten
+
+
+def _version_datetime(version):
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+def _etag(*parts):
+    return hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+
+
+def _kitten_updated_at(request, kitten_id):
+    # ETag и Last-Modified вычисляются по одному запросу к БД
+    if not hasattr(request, "kitten_updated_at"):
+        request.kitten_updated_at = (
+            Kitten.objects.filter(pk=kitten_id)
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+    return request.kitten_updated_at
+
+
+def breed_list_etag(request, *args, **kwargs):
+    return _etag(request.get_full_path(), cache.get_version(cache.BREEDS))
+
+
+def breed_list_last_modified(request, *args, **kwargs):
+    return _version_datetime(cache.get_version(cache.BREEDS))
+
+
+def kitten_list_etag(request, *args, **kwargs):
+    return _etag(request.get_full_path(), cache.get_version(cache.KITTENS))
+
+
+def kitten_list_last_modified(request, *args, **kwargs):
+    return _version_datetime(cache.get_version(cache.KITTENS))
+
+
+def kitten_detail_etag(request, pk, *args, **kwargs):
+    updated_at = _kitten_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    # Порода котика может быть переименована без изменения самого котика
+    return _etag(pk, updated_at.isoformat(), cache.get_version(cache.BREEDS))
+
+
+def kitten_detail_last_modified(request, pk, *args, **kwargs):
+    updated_at = _kitten_updated_at(request, pk)
+    if updated_at is None:
+        return None
+    return max(updated_at, _version_datetime(cache.get_version(cache.BREEDS)))
+
+
+def conditional_get(etag_func, last_modified_func):
+    """Декоратор класса представления для условных GET-запросов"""
+    return method_decorator(
+        condition(etag_func=etag_func, last_modified_func=last_modified_func),
+        name="get",
+    )
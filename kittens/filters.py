@@ -0,0 +1,130 @@
+from django import forms
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+from rest_framework.filters import BaseFilterBackend
+
+from kittens import breeds, search
+from kittens.models import Breed, Kitten
+from kittens.serializers import MAX_ID
+
+# Верхние границы PositiveSmallIntegerField и оценки котика
+MAX_AGE = 32767
+MAX_RATING = 5
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Список чисел через запятую"""
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    """Список строк через запятую"""
+
+
+class BoundedNumberFilter(filters.NumberFilter):
+    """Сравнение gte/lte, дополненное второй границей допустимых значений поля
+
+    Без статистики SQLite считает одностороннее сравнение неселективным
+    и читает таблицу целиком, а для диапазона с двумя границами берет индекс.
+    """
+
+    def __init__(self, *args, bound, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bound = bound
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if self.lookup_expr == "gte":
+            limits = (value, self.bound)
+        else:
+            limits = (self.bound, value)
+        return self.get_method(qs)(**{f"{self.field_name}__range": limits})
+
+
+class BreedChoiceField(forms.ModelChoiceField):
+    """Выбор породы, проверяемый по справочнику пород без запроса к БД"""
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            breed = breeds.get_breed(int(value))
+        except (TypeError, ValueError):
+            breed = None
+        if breed is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice"
+            )
+        return breed
+
+
+class BreedFilter(filters.ModelChoiceFilter):
+    """Фильтр по породе с проверкой по справочнику пород"""
+
+    field_class = BreedChoiceField
+
+
+class KittenOrderingFilter(filters.OrderingFilter):
+    """Сортировка котиков с id для однозначного порядка"""
+
+    def filter(self, qs, value):
+        qs = super().filter(qs, value)
+        if value:
+            qs = qs.order_by(*qs.query.order_by, "id")
+        return qs
+
+
+class KittenFilter(filters.FilterSet):
+    """Фильтры списка котиков; каждому сочетанию соответствует индекс"""
+
+    # Границы значений проверяет форма: большие числа не доходят до запроса
+    age__gte = BoundedNumberFilter(
+        field_name="age",
+        lookup_expr="gte",
+        bound=MAX_AGE,
+        min_value=0,
+        max_value=MAX_AGE,
+    )
+    age__lte = BoundedNumberFilter(
+        field_name="age", lookup_expr="lte", bound=0, min_value=0, max_value=MAX_AGE
+    )
+    color__in = CharInFilter(field_name="color", lookup_expr="in")
+    breed = BreedFilter(queryset=Breed.objects.all())
+    breed__in = NumberInFilter(
+        field_name="breed_id", lookup_expr="in", min_value=1, max_value=MAX_ID
+    )
+    min_rating = BoundedNumberFilter(
+        field_name="average_rating",
+        lookup_expr="gte",
+        bound=MAX_RATING,
+        min_value=0,
+        max_value=MAX_RATING,
+    )
+    ordering = KittenOrderingFilter(fields=("id", "age", "average_rating"))
+
+    class Meta:
+        model = Kitten
+        fields = ["breed"]
+
+
+class KittenSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск котиков по описанию и цвету"""
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        return search.search(queryset, text)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Слова для поиска в описании и цвете котика",
+                "schema": {"type": "string"},
+            }
+        ]
@@ -0,0 +1,325 @@
+import atexit
+import logging
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from kittens import cache
+from kittens.models import Kitten, Rating, User
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - flock есть только в POSIX
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Журнал каждого процесса: ratings-<pid>.log и ratings-<pid>.checkpoint
+LOG_PREFIX = "ratings-"
+LOG_SUFFIX = ".log"
+
+
+class BufferFull(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Очередь оценок переполнена, повторите запрос позже."
+    default_code = "ingestion_buffer_full"
+
+
+def log_path(directory, pid):
+    return Path(directory) / f"{LOG_PREFIX}{pid}{LOG_SUFFIX}"
+
+
+def checkpoint_path(path):
+    return path.with_suffix(".checkpoint")
+
+
+def lock_log(log, wait=False):
+    """Блокирует открытый журнал; False, если его держит другой процесс
+
+    Блокировка снимается с закрытием файла, в том числе при падении процесса.
+    Журнал, удаленный с диска, пока блокировка ожидалась, тоже дает False.
+    """
+    if fcntl is None:
+        return True
+    flags = fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB
+    try:
+        fcntl.flock(log.fileno(), flags)
+        return os.path.samestat(os.fstat(log.fileno()), os.stat(log.name))
+    except (BlockingIOError, FileNotFoundError):
+        return False
+
+
+def open_log(path):
+    """Открывает журнал на дописывание под блокировкой процесса"""
+    while True:
+        log = open(path, "ab", buffering=0)
+        if lock_log(log, wait=True):
+            return log
+        # Журнал повторил и удалил другой процесс: открывается новый
+        log.close()
+
+
+def read_checkpoint(path):
+    """Позиция в журнале, до которой оценки уже записаны в базу"""
+    try:
+        return int(checkpoint_path(path).read_text())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def write_checkpoint(path, offset):
+    target = checkpoint_path(path)
+    temporary = target.with_suffix(".tmp")
+    temporary.write_text(str(offset))
+    os.replace(temporary, target)
+
+
+def read_log(path, offset=0):
+    """Оценки журнала после позиции offset: (котик, пользователь, оценка)"""
+    with open(path, "rb") as log:
+        log.seek(offset)
+        for line in log:
+            # Строка, оборванная падением процесса, не была подтверждена клиенту
+            if not line.endswith(b"\n"):
+                break
+            yield tuple(map(int, line.split()))
+
+
+def write_ratings(entries):
+    """Пишет оценки в базу одной транзакцией; возвращает число записанных"""
+    with transaction.atomic():
+        # Котик или пользователь могли быть удалены после приема оценки
+        kitten_ids = set(
+            Kitten.objects.filter(pk__in={entry[0] for entry in entries}).values_list(
+                "pk", flat=True
+            )
+        )
+        user_ids = set(
+            User.objects.filter(pk__in={entry[1] for entry in entries}).values_list(
+                "pk", flat=True
+            )
+        )
+        ratings = Rating.objects.upsert(
+            Rating(kitten_id=kitten_id, user_id=user_id, rating=rating)
+            for kitten_id, user_id, rating in entries
+            if kitten_id in kitten_ids and user_id in user_ids
+        )
+    if ratings:
+        # upsert не отправляет сигналы, поэтому кеш сбрасывается явно
+        cache.bump_version(
+            cache.KITTENS,
+            *{cache.kitten_namespace(rating.kitten_id) for rating in ratings},
+        )
+    return len(ratings)
+
+
+def write_log(path, batch_size):
+    """Дописывает в базу оценки журнала после контрольной точки
+
+    Повтор идемпотентен: upsert заменяет оценку той же пары котик-пользователь,
+    поэтому оценки, записанные до падения, можно повторить еще раз.
+    """
+    entries = list(read_log(path, read_checkpoint(path)))
+    written = 0
+    for start in range(0, len(entries), batch_size):
+        written += write_ratings(entries[start : start + batch_size])
+    checkpoint_path(path).unlink(missing_ok=True)
+    return written
+
+
+def replay_log(path, batch_size):
+    """Повторяет журнал остановленного процесса и удаляет его
+
+    Журнал работающего процесса заблокирован им и пропускается.
+    """
+    try:
+        log = open(path, "rb")
+    except FileNotFoundError:
+        return 0
+    with log:
+        if not lock_log(log):
+            logger.info("Rating log %s is in use, skipped", path)
+            return 0
+        written = write_log(path, batch_size)
+        path.unlink()
+    return written
+
+
+def replay_logs(directory, batch_size):
+    """Повторяет журналы остановленных процессов из каталога"""
+    current = _buffer.path if _buffer is not None else None
+    written = 0
+    for path in sorted(Path(directory).glob(f"{LOG_PREFIX}*{LOG_SUFFIX}")):
+        if path != current:
+            written += replay_log(path, batch_size)
+    return written
+
+
+class RatingBuffer:
+    """Очередь принятых оценок процесса с журналом на диске
+
+    Оценка сначала дописывается в журнал и только потом подтверждается
+    клиенту. Фоновый поток пишет очередь в базу пачками по batch_size
+    оценок или раз в flush_interval секунд.
+    """
+
+    def __init__(self, path, batch_size, flush_interval, max_pending, fsync=True):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self.pid = os.getpid()
+        # (котик, пользователь, оценка, конец строки в журнале)
+        self._pending = []
+        self._offset = 0
+        self._synced = 0
+        self._log = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._log = open_log(self.path)
+        # Журнал от упавшего процесса с тем же pid повторяется до приема новых оценок
+        if os.fstat(self._log.fileno()).st_size:
+            write_log(self.path, self.batch_size)
+            self._log.truncate(0)
+
+    def start(self):
+        self.open()
+        self._thread = threading.Thread(
+            target=self.run, name="kittens-rating-ingestion", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Останавливает фоновый поток, дописав очередь в базу"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        else:
+            self.flush_safely()
+        self._log.close()
+
+    def add(self, kitten_id, user_id, rating):
+        """Записывает оценку в журнал и ставит ее в очередь на запись в базу"""
+        line = b"%d %d %d\n" % (kitten_id, user_id, rating)
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                raise BufferFull
+            self._log.write(line)
+            self._offset += len(line)
+            end = self._offset
+            self._pending.append((kitten_id, user_id, rating, end))
+            full = len(self._pending) >= self.batch_size
+        if self.fsync:
+            self.sync(end)
+        if full:
+            self._wakeup.set()
+
+    def sync(self, end):
+        """Сбрасывает журнал на диск до позиции end
+
+        Один fsync подтверждает все строки, записанные до него, поэтому
+        параллельные запросы ждут чужой синхронизации вместо своей.
+        """
+        with self._sync_lock:
+            if self._synced >= end:
+                return
+            offset = self._offset
+            os.fsync(self._log.fileno())
+            self._synced = offset
+
+    def flush(self):
+        """Пишет очередь в базу пачками; возвращает число принятых оценок"""
+        flushed = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._pending[: self.batch_size]
+                if not batch:
+                    return flushed
+                write_ratings([entry[:3] for entry in batch])
+                with self._sync_lock, self._lock:
+                    del self._pending[: len(batch)]
+                    self.checkpoint(batch[-1][3])
+                flushed += len(batch)
+
+    def checkpoint(self, offset):
+        """Отмечает, что оценки журнала до позиции offset записаны в базу"""
+        if self._pending or offset != self._offset:
+            write_checkpoint(self.path, offset)
+            return
+        # Все оценки журнала уже в базе: журнал начинается заново
+        checkpoint_path(self.path).unlink(missing_ok=True)
+        self._log.truncate(0)
+        self._offset = self._synced = 0
+
+    def flush_safely(self):
+        try:
+            self.flush()
+        except Exception:
+            # Оценки остаются в очереди и журнале до следующей попытки
+            logger.exception(
+                "Rating ingestion flush failed, %d ratings pending", len(self)
+            )
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush_safely()
+            self.flush_safely()
+        finally:
+            connections.close_all()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Буфер оценок текущего процесса; поток записи запускается при первом вызове"""
+    global _buffer
+    pid = os.getpid()
+    if _buffer is None or _buffer.pid != pid:
+        with _buffer_lock:
+            # После fork буфер родителя и его поток дочернему процессу не достаются
+            if _buffer is None or _buffer.pid != pid:
+                buffer = RatingBuffer(
+                    log_path(settings.KITTENS_INGESTION_LOG_DIR, pid),
+                    batch_size=settings.KITTENS_INGESTION_BATCH_SIZE,
+                    flush_interval=settings.KITTENS_INGESTION_FLUSH_INTERVAL,
+                    max_pending=settings.KITTENS_INGESTION_MAX_PENDING,
+                    fsync=settings.KITTENS_INGESTION_FSYNC,
+                )
+                # Другие потоки проверяют _buffer без блокировки, поэтому
+                # буфер публикуется только после открытия журнала
+                buffer.start()
+                _buffer = buffer
+    return _buffer
+
+
+@atexit.register
+def shutdown():
+    """Дописывает очередь процесса в базу и останавливает поток записи"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None and _buffer.pid == os.getpid():
+            _buffer.stop()
+        _buffer = None
@@ -0,0 +1,518 @@
+import asyncio
+import logging
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from kittens import cache, ingestion, search
+from kittens.management.commands.generate_data import COLORS, TRAITS, batched
+from kittens.middleware import query_budget
+from kittens.models import Breed, Kitten, Rating
+from kittens.renderers import FastJSONRenderer
+from kittens.serializers import (ClaimsTokenObtainPairSerializer,
+                                 KittenRowSerializer, KittenSerializer)
+
+User = get_user_model()
+
+# Из слогов складываются 1000 кличек: редкие слова для поиска
+SYLLABLES = ['ба', 'му', 'ся', 'ри', 'ко', 'то', 'ша', 'пу', 'ми', 'лу']
+
+
+def random_name(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(3)).capitalize()
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks inside a rolled back transaction'
+
+    scenarios = {
+        'bulk_create': 'bench_bulk_create',
+        'async_reads': 'bench_async_reads',
+        'concurrent_ratings': 'bench_concurrent_ratings',
+        'endpoints': 'bench_endpoints',
+        'ingestion': 'bench_ingestion',
+        'renderers': 'bench_renderers',
+        'search': 'bench_search',
+        'serializers': 'bench_serializers',
+    }
+    # Сценарии с параллельными соединениями и сценарий эндпоинтов, бюджеты
+    # которого считаются в режиме autocommit, как в продакшене: внутри внешней
+    # транзакции atomic() представлений добавлял бы SAVEPOINT и RELEASE.
+    # Данные этих сценариев коммитятся и удаляются после
+    committed_scenarios = {'async_reads', 'concurrent_ratings', 'endpoints', 'ingestion'}
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(self.scenarios))
+        parser.add_argument(
+            '--size', type=int, default=500, help='Number of objects per scenario'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Invalidate the response cache before every request',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8, help='Number of parallel clients'
+        )
+
+    # Ограничение частоты измеряло бы лимиты, а не скорость эндпоинтов
+    @override_settings(KITTENS_THROTTLE_RATES={})
+    def handle(self, *args, **options):
+        if options['scenario'] in self.committed_scenarios:
+            getattr(self, self.scenarios[options['scenario']])(**options)
+            return
+        # Данные бенчмарка не остаются в базе
+        with transaction.atomic():
+            getattr(self, self.scenarios[options['scenario']])(**options)
+            transaction.set_rollback(True)
+
+    def report(self, name, count, seconds, unit='rows'):
+        self.stdout.write(
+            f'{name:<24} {count:>8} {unit} {seconds:>9.3f} s '
+            f'{count / seconds:>12.1f} {unit}/s'
+        )
+
+    @staticmethod
+    def get_host():
+        # Клиент должен обращаться к хосту, разрешенному в ALLOWED_HOSTS
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def get_client(self, user):
+        client = APIClient(SERVER_NAME=self.get_host())
+        token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def post(self, client, url, data):
+        response = client.post(url, data, format='json')
+        if response.status_code >= 400:
+            raise CommandError(f'POST {url} failed: {response.data}')
+        return response
+
+    def bench_bulk_create(self, size, **options):
+        user = User.objects.create_user(username='benchmark_user')
+        breed = Breed.objects.create(name='Benchmark')
+        client = self.get_client(user)
+        kittens_data = [
+            {'breed': breed.id, 'color': 'Серый', 'age': 1 + i % 24, 'description': 'Котёнок'}
+            for i in range(size)
+        ]
+
+        # Создаем котят по одному через обычный эндпоинт
+        started = time.perf_counter()
+        for kitten_data in kittens_data:
+            self.post(client, '/api/', kitten_data)
+        self.report('single POST /api/', size, time.perf_counter() - started)
+
+        # Создаем котят одним запросом
+        started = time.perf_counter()
+        self.post(client, '/api/bulk/', kittens_data)
+        self.report('bulk POST /api/bulk/', size, time.perf_counter() - started)
+
+    def bench_endpoints(self, size, cold, **options):
+        user = User.objects.create_user(
+            username='benchmark_user', password='benchmark', is_staff=True
+        )
+        breed = Breed.objects.create(name='Benchmark')
+        try:
+            self.measure_endpoints(user, breed, size, cold)
+        finally:
+            # Котики и оценки удаляются каскадом вместе с пользователем и породами
+            user.delete()
+            breed.delete()
+            Breed.objects.filter(name__in=[f'Benchmark {i}' for i in range(size)]).delete()
+
+    def measure_endpoints(self, user, breed, size, cold):
+        client = self.get_client(user)
+        kittens = Kitten.objects.bulk_create(
+            Kitten(breed=breed, color='Серый', age=1, description='Котёнок', owner=user)
+            for _ in range(size)
+        )
+        kitten = Kitten.objects.order_by('id').first()
+        kitten_data = {'breed': breed.id, 'color': 'Серый', 'age': 2, 'description': 'Котёнок'}
+
+        detail_url = reverse('kitten_detail_update_delete', args=(kitten.id,))
+        list_url = reverse('kitten_list_create')
+
+        # (название, метод, функция от номера запроса -> (URL, тело запроса))
+        endpoints = [
+            ('GET async kitten list', 'get', lambda i: (reverse('async_kitten_list'), None)),
+            (
+                'GET async kitten detail',
+                'get',
+                lambda i: (reverse('async_kitten_detail', args=(kitten.id,)), None),
+            ),
+            ('GET async breeds', 'get', lambda i: (reverse('async_breed_list'), None)),
+            ('GET kitten list', 'get', lambda i: (list_url, None)),
+            ('GET kitten list cursor', 'get', lambda i: (f'{list_url}?pagination=cursor', None)),
+            ('GET kitten search', 'get', lambda i: (f'{list_url}?search=котёнок', None)),
+            ('GET kitten detail', 'get', lambda i: (detail_url, None)),
+            ('GET leaderboard', 'get', lambda i: (reverse('kitten_leaderboard'), None)),
+            ('GET breeds', 'get', lambda i: (reverse('breed_list_create'), None)),
+            ('GET breed stats', 'get', lambda i: (reverse('breed_stats'), None)),
+            ('GET metrics', 'get', lambda i: (reverse('metrics'), None)),
+            ('GET export', 'get', lambda i: (reverse('kitten_export'), None)),
+            ('GET cache stats', 'get', lambda i: (reverse('cache_stats'), None)),
+            ('POST kitten', 'post', lambda i: (list_url, kitten_data)),
+            (
+                'POST breed',
+                'post',
+                lambda i: (reverse('breed_list_create'), {'name': f'Benchmark {i}'}),
+            ),
+            ('POST kitten bulk', 'post', lambda i: (reverse('kitten_bulk_create'), [kitten_data] * 10)),
+            (
+                'PUT kitten',
+                'put',
+                lambda i: (
+                    reverse('kitten_detail_update_delete', args=(kittens[0].id,)),
+                    kitten_data,
+                ),
+            ),
+            (
+                'POST rating',
+                'post',
+                lambda i: (reverse('kitten_rate', args=(kittens[i].id,)), {'rating': 1 + i % 5}),
+            ),
+            (
+                'POST rating bulk',
+                'post',
+                lambda i: (
+                    reverse('kitten_bulk_rate'),
+                    [{'kitten': k.id, 'rating': 1 + i % 5} for k in kittens[:10]],
+                ),
+            ),
+            (
+                'DELETE kitten',
+                'delete',
+                lambda i: (reverse('kitten_detail_update_delete', args=(kittens[i].id,)), None),
+            ),
+            (
+                'POST token',
+                'post',
+                lambda i: (
+                    reverse('token_obtain_pair'),
+                    {'username': 'benchmark_user', 'password': 'benchmark'},
+                ),
+            ),
+        ]
+
+        self.stdout.write(
+            f'{"endpoint":<24} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8}'
+        )
+        # Превышение бюджета SQL-запросов middleware только пишет в лог,
+        # а бенчмарк завершается ошибкой после полного отчета
+        exceeded = []
+        for name, method, build_request in endpoints:
+            timings, queries = [], []
+            for i in range(size):
+                if cold:
+                    cache.bump_version(cache.BREEDS, cache.KITTENS, cache.kitten_namespace(kitten.id))
+                url, data = build_request(i)
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data, format='json')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    raise CommandError(f'{name} failed with {response.status_code}')
+                queries.append(len(captured))
+
+            percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+            self.stdout.write(
+                f'{name:<24} {percentiles[49]:>9.2f} {percentiles[94]:>9.2f} '
+                f'{percentiles[98]:>9.2f} {statistics.mean(queries):>8.1f}'
+            )
+            budget = query_budget(response.wsgi_request, response.resolver_match.view_name)
+            if max(queries) > budget:
+                exceeded.append(f'{name}: {max(queries)} SQL queries, budget is {budget}')
+
+        if exceeded:
+            raise CommandError('Query budget exceeded:\n' + '\n'.join(exceeded))
+
+    def bench_serializers(self, size, **options):
+        user = User.objects.create_user(username='benchmark_user')
+        breed = Breed.objects.create(name='Benchmark')
+        Kitten.objects.bulk_create(
+            Kitten(breed=breed, color='Серый', age=1 + i % 24, description='Котёнок', owner=user)
+            for i in range(size)
+        )
+        kittens = Kitten.objects.filter(breed=breed).order_by('id')
+        objects = list(kittens.select_related('owner'))
+        rows = list(kittens.values(*KittenRowSerializer.fields))
+
+        # Сравниваем только сериализацию уже загруженных данных
+        for name, serializer_class, data in (
+            ('KittenSerializer', KittenSerializer, objects),
+            ('KittenRowSerializer', KittenRowSerializer, rows),
+        ):
+            started = time.perf_counter()
+            serializer_class(data, many=True).data
+            self.report(name, size, time.perf_counter() - started, unit='objects')
+
+    def bench_renderers(self, size, **options):
+        user = User.objects.create_user(username='benchmark_user')
+        breed = Breed.objects.create(name='Британская')
+        Kitten.objects.bulk_create(
+            Kitten(
+                breed=breed,
+                color='Серый',
+                age=1 + i % 24,
+                description='Очень игривый и любопытный котёнок',
+                owner=user,
+            )
+            for i in range(size)
+        )
+        rows = list(
+            Kitten.objects.filter(breed=breed).values(*KittenRowSerializer.fields)
+        )
+        data = KittenRowSerializer(rows, many=True).data
+
+        # Страницы списка котиков разных размеров
+        for page_size in (5, 50, 500, size):
+            page = {
+                'count': size,
+                'next': None,
+                'previous': None,
+                'results': data[:page_size],
+            }
+            repeat = max(1, 20000 // page_size)
+            for name, renderer in (
+                ('JSONRenderer', JSONRenderer()),
+                ('FastJSONRenderer', FastJSONRenderer()),
+            ):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    renderer.render(page)
+                self.report(
+                    f'{name} x{page_size}',
+                    repeat,
+                    time.perf_counter() - started,
+                    unit='pages',
+                )
+
+    def bench_search(self, size, **options):
+        user = User.objects.create_user(username='benchmark_user')
+        breed = Breed.objects.create(name='Benchmark')
+        rng = random.Random(42)
+        started = time.perf_counter()
+        kittens = (
+            Kitten(
+                breed=breed,
+                color=rng.choice(COLORS),
+                age=1 + i % 24,
+                description=(
+                    f'Очень {rng.choice(TRAITS)} и {rng.choice(TRAITS)} котёнок '
+                    f'по кличке {random_name(rng)}'
+                ),
+                owner=user,
+            )
+            for i in range(size)
+        )
+        for batch in batched(kittens, 5000):
+            search.index_kittens(Kitten.objects.bulk_create(batch))
+        self.report('create and index', size, time.perf_counter() - started)
+
+        queryset = Kitten.objects.filter(breed=breed).order_by('id')
+        # (запрос, условие icontains для сравнения)
+        queries = [
+            ('Мурико', Q(description__icontains='Мурико')),
+            ('спокойный Мурико', Q(description__icontains='спокойный')
+             & Q(description__icontains='Мурико')),
+            ('пушистый', Q(description__icontains='пушистый')),
+            ('рыжий котёнок', Q(color__icontains='Рыжий') & Q(description__icontains='котёнок')),
+            ('спокойного ласкового', Q(description__icontains='спокойный')
+             & Q(description__icontains='ласковый')),
+        ]
+        repeat = 20
+        for text, condition in queries:
+            for name, build_queryset in (
+                (f'icontains {text}', lambda: queryset.filter(condition)),
+                (f'search {text}', lambda: search.search(queryset, text)),
+            ):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    result = build_queryset()
+                    result.count()
+                    list(result[:20])
+                self.report(name, repeat, time.perf_counter() - started, unit='pages')
+
+    def bench_concurrent_ratings(self, size, threads, **options):
+        breed = Breed.objects.create(name='Benchmark concurrent')
+        owner = User.objects.create_user(username='benchmark_concurrent')
+        try:
+            kittens = Kitten.objects.bulk_create(
+                Kitten(breed=breed, color='Серый', age=1, description='Котёнок', owner=owner)
+                for _ in range(size)
+            )
+            self.stdout.write(f'{"clients":<24} {"ratings/s":>12} {"p95 ms":>9} {"errors":>8}')
+            for clients in sorted({1, threads}):
+                self.rate_in_parallel(kittens, clients)
+        finally:
+            # Оценки и котики удаляются каскадно
+            User.objects.filter(username__startswith='benchmark_concurrent').delete()
+            breed.delete()
+
+    def bench_ingestion(self, size, threads, **options):
+        breed = Breed.objects.create(name='Benchmark ingestion')
+        owner = User.objects.create_user(username='benchmark_concurrent')
+        try:
+            kittens = Kitten.objects.bulk_create(
+                Kitten(breed=breed, color='Серый', age=1, description='Котёнок', owner=owner)
+                for _ in range(size)
+            )
+            self.stdout.write(f'{"mode":<24} {"ratings/s":>12} {"p95 ms":>9} {"errors":>8}')
+            self.rate_in_parallel(kittens, threads, label='sync')
+
+            # Отдельный каталог журнала, чтобы не смешивать оценки с рабочими
+            with tempfile.TemporaryDirectory() as log_dir, override_settings(
+                KITTENS_RATING_INGESTION=True, KITTENS_INGESTION_LOG_DIR=log_dir
+            ):
+                started = time.perf_counter()
+                errors = self.rate_in_parallel(kittens, threads, label='buffered')
+                # Устойчивая скорость считается до записи последней пачки в базу
+                ingestion.shutdown()
+                seconds = time.perf_counter() - started
+            written = Rating.objects.filter(
+                kitten__in=kittens, user__username__startswith='benchmark_concurrent_buffered'
+            ).count()
+            self.stdout.write(f'{"buffered, committed":<24} {written / seconds:>12.1f}')
+            # Каждая подтвержденная ответом 202 оценка должна дойти до базы.
+            # Тестовый клиент может приписать ошибку чужого потока, поэтому
+            # accepted — нижняя граница
+            accepted = size * threads - errors
+            if written < accepted:
+                raise CommandError(f'Only {written} of {accepted} accepted ratings were written')
+        finally:
+            User.objects.filter(username__startswith='benchmark_concurrent').delete()
+            breed.delete()
+
+    def rate_in_parallel(self, kittens, clients, label=None):
+        label = label or clients
+        users = [
+            User.objects.create_user(username=f'benchmark_concurrent_{label}_{i}')
+            for i in range(clients)
+        ]
+
+        def rate(user):
+            # Каждый поток работает через свое соединение с базой
+            client = self.get_client(user)
+            timings, errors = [], 0
+            try:
+                for kitten in kittens:
+                    url = reverse('kitten_rate', args=(kitten.id,))
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(url, {'rating': 5}, format='json')
+                        errors += response.status_code >= 400
+                    except Exception:
+                        errors += 1
+                    timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+            return timings, errors
+
+        # Ошибки блокировок считаются в отчете, трассировки в лог не пишутся
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=clients) as executor:
+                results = list(executor.map(rate, users))
+        finally:
+            request_logger.setLevel(level)
+        seconds = time.perf_counter() - started
+
+        timings = [timing for result in results for timing in result[0]]
+        errors = sum(result[1] for result in results)
+        p95 = statistics.quantiles(timings, n=100, method='inclusive')[94]
+        self.stdout.write(
+            f'{label:<24} {len(timings) / seconds:>12.1f} {p95:>9.2f} {errors:>8}'
+        )
+        return errors
+
+    def bench_async_reads(self, size, threads, cold, **options):
+        breed = Breed.objects.create(name='Benchmark async')
+        owner = User.objects.create_user(username='benchmark_async')
+        try:
+            kittens = Kitten.objects.bulk_create(
+                Kitten(breed=breed, color='Серый', age=1, description='Котёнок', owner=owner)
+                for _ in range(100)
+            )
+            paths = ['', f'{kittens[0].id}/', 'breeds/']
+            self.stdout.write(
+                f'{"handler":<24} {"requests/s":>12} {"p50 ms":>9} {"p99 ms":>9}'
+            )
+            self.report_latency(
+                f'WSGI x{threads}', size, self.read_in_threads(paths, size, threads, cold)
+            )
+            # AsyncClient всегда отправляет заголовок Host: testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                self.report_latency(
+                    f'ASGI async x{threads}',
+                    size,
+                    asyncio.run(self.read_concurrently(paths, size, threads)),
+                )
+        finally:
+            owner.delete()
+            breed.delete()
+
+    def report_latency(self, name, count, result):
+        seconds, timings = result
+        percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+        self.stdout.write(
+            f'{name:<24} {count / seconds:>12.1f} {percentiles[49]:>9.2f} '
+            f'{percentiles[98]:>9.2f}'
+        )
+
+    def read_in_threads(self, paths, size, threads, cold):
+        """Синхронные DRF-представления, по потоку на клиента, как под WSGI"""
+
+        def read(i):
+            if cold:
+                cache.bump_version(cache.BREEDS, cache.KITTENS)
+            started = time.perf_counter()
+            response = Client(SERVER_NAME=self.get_host()).get(
+                f'/api/{paths[i % len(paths)]}'
+            )
+            if response.status_code >= 400:
+                raise CommandError(f'WSGI read failed with {response.status_code}')
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            timings = list(executor.map(read, range(size)))
+        connections.close_all()
+        return time.perf_counter() - started, timings
+
+    async def read_concurrently(self, paths, size, threads):
+        """Асинхронные представления, threads запросов одновременно"""
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(threads)
+
+        async def read(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(f'/api/async/{paths[i % len(paths)]}')
+                if response.status_code >= 400:
+                    raise CommandError(f'ASGI read failed with {response.status_code}')
+                return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(read(i) for i in range(size)))
+        return time.perf_counter() - started, timings
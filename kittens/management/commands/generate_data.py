@@ -0,0 +1,122 @@
+import random
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from kittens import cache, search
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+BREEDS = [
+    'Сиамская', 'Британская', 'Мейн-кун', 'Сфинкс', 'Персидская',
+    'Бенгальская', 'Шотландская', 'Русская голубая', 'Абиссинская', 'Рэгдолл',
+]
+COLORS = ['Серый', 'Черный', 'Белый', 'Рыжий', 'Кремовый', 'Трехцветный', 'Полосатый']
+TRAITS = ['игривый', 'спокойный', 'любопытный', 'ласковый', 'пушистый', 'озорной']
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Generate a large deterministic dataset of users, kittens and ratings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--kittens', type=int, default=10000)
+        parser.add_argument('--ratings', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix', default='gen', help='Username prefix of generated users'
+        )
+
+    def handle(self, *args, **options):
+        if options['ratings'] > options['users'] * options['kittens']:
+            options['ratings'] = options['users'] * options['kittens']
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        # Пароль хешируется один раз: хеширование на каждого пользователя слишком медленное
+        password = make_password('password')
+        user_ids = self.insert(
+            'users',
+            (
+                User(username=f"{options['prefix']}_{options['seed']}_{i}", password=password)
+                for i in range(options['users'])
+            ),
+            User,
+            batch_size,
+        )
+
+        breed_ids = []
+        for name in BREEDS:
+            breed, _ = Breed.objects.get_or_create(name=name)
+            breed_ids.append(breed.id)
+
+        kitten_ids = self.insert(
+            'kittens',
+            (
+                Kitten(
+                    breed_id=rng.choice(breed_ids),
+                    color=rng.choice(COLORS),
+                    age=rng.randint(1, 24),
+                    description=f'Очень {rng.choice(TRAITS)} и {rng.choice(TRAITS)} котёнок',
+                    owner_id=rng.choice(user_ids),
+                )
+                for _ in range(options['kittens'])
+            ),
+            Kitten,
+            batch_size,
+        )
+
+        # Пары (котенок, пользователь) уникальны: для котенка k и круга j
+        # пользователь равен (k * 7919 + j) % users, а j < users
+        kittens_count, users_count = len(kitten_ids), len(user_ids)
+        self.insert(
+            'ratings',
+            (
+                Rating(
+                    kitten_id=kitten_ids[i % kittens_count],
+                    user_id=user_ids[(i % kittens_count * 7919 + i // kittens_count) % users_count],
+                    rating=rng.randint(1, 5),
+                )
+                for i in range(options['ratings'])
+            ),
+            Rating,
+            batch_size,
+        )
+
+        started = time.perf_counter()
+        for ids in batched(kitten_ids, batch_size):
+            Kitten.objects.filter(pk__in=ids).refresh_rating_stats()
+        self.stdout.write(f'rating aggregates: {time.perf_counter() - started:.1f} s')
+
+        started = time.perf_counter()
+        for ids in batched(kitten_ids, batch_size):
+            with transaction.atomic():
+                search.index_kittens(
+                    Kitten.objects.filter(pk__in=ids).only('color', 'description')
+                )
+        self.stdout.write(f'search index: {time.perf_counter() - started:.1f} s')
+        # bulk_create не отправляет сигналы, поэтому кеш сбрасывается явно
+        cache.bump_version(cache.BREEDS, cache.KITTENS)
+
+        self.stdout.write(self.style.SUCCESS('Synthetic data generated successfully'))
+
+    def insert(self, name, objects, model, batch_size):
+        ids = []
+        started = time.perf_counter()
+        for batch in batched(objects, batch_size):
+            with transaction.atomic():
+                ids += [obj.pk for obj in model.objects.bulk_create(batch)]
+        self.stdout.write(f'{name}: {len(ids)} rows in {time.perf_counter() - started:.1f} s')
+        return ids
@@ -0,0 +1,128 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from kittens import cache, stats
+from kittens.models import STAR_FIELDS, Breed, Kitten
+
+
+class Command(BaseCommand):
+    help = 'Recompute and verify denormalized kitten and breed rating aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify aggregates and fail if any of them are stale',
+        )
+        parser.add_argument(
+            '--vectorized',
+            action='store_true',
+            help=(
+                'Rebuild from one scan of the ratings table counted with NumPy '
+                '(plain Python without it) and write only stale rows'
+            ),
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Сравниваем сохраненные агрегаты с гистограммами по таблице рейтингов.
+        # Запись по гистограммам сканирования идет в той же транзакции: оценка,
+        # добавленная между чтением и записью, была бы затерта
+        vectorized = options['vectorized'] and not options['check']
+        started = time.perf_counter()
+        with transaction.atomic():
+            if vectorized:
+                self.use_snapshot()
+            kitten_histograms, breed_histograms = stats.compute_histograms()
+            stale = stats.find_stale(Kitten.objects.all(), kitten_histograms)
+            stale_breeds = stats.find_stale(Breed.objects.all(), breed_histograms)
+            engine = 'numpy' if stats.np is not None else 'python'
+            self.stdout.write(
+                f'scanned ratings ({engine}): {time.perf_counter() - started:.1f} s'
+            )
+
+            if options['check']:
+                if stale or stale_breeds:
+                    raise CommandError(
+                        f'Stale rating aggregates for kittens: {", ".join(map(str, stale))}; '
+                        f'breeds: {", ".join(map(str, stale_breeds))}'
+                    )
+                self.stdout.write(self.style.SUCCESS('Rating aggregates are consistent'))
+                return
+
+            started = time.perf_counter()
+            if vectorized:
+                updated = self.write(
+                    Kitten, stale, kitten_histograms, options['batch_size']
+                )
+                self.write(Breed, stale_breeds, breed_histograms, options['batch_size'])
+
+        if not vectorized:
+            # Пересчет в SQL читает текущие оценки, отдельная транзакция не
+            # теряет записанные после сканирования.
+            # Породы пересчитываются целиком, а не переносом разницы
+            with transaction.atomic():
+                updated = Kitten.objects.refresh_rating_stats(update_breeds=False)
+                Breed.objects.refresh_rating_stats()
+        # Массовое обновление не отправляет сигналы, поэтому кеш сбрасывается явно
+        cache.bump_version(
+            cache.KITTENS, *(cache.kitten_namespace(kitten_id) for kitten_id in stale)
+        )
+        self.stdout.write(f'write: {time.perf_counter() - started:.1f} s')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Recomputed rating aggregates for {updated} kittens, '
+                f'{len(stale)} were stale, {len(stale_breeds)} breeds were stale'
+            )
+        )
+
+    @staticmethod
+    def use_snapshot():
+        """Один снимок базы на всю транзакцию сканирования и записи
+
+        SQLite с BEGIN IMMEDIATE уже не пускает другие записи до конца
+        транзакции. В PostgreSQL при REPEATABLE READ запись строки, измененной
+        после сканирования, прерывается ошибкой сериализации вместо потери оценки.
+        """
+        connection = connections[router.db_for_write(Kitten)]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+    @staticmethod
+    def write(model, ids, histograms, batch_size):
+        # Один подготовленный UPDATE через executemany: bulk_update строит
+        # CASE по всем строкам пачки и на больших таблицах в десятки раз медленнее
+        connection = connections[router.db_for_write(model)]
+        quote = connection.ops.quote_name
+        is_kitten = model is Kitten
+        fields = ['rating_count', 'rating_sum', *STAR_FIELDS]
+        if is_kitten:
+            fields += ['average_rating', 'updated_at']
+            updated_at = model._meta.get_field('updated_at').get_db_prep_value(
+                timezone.now(), connection
+            )
+        sql = (
+            f'UPDATE {quote(model._meta.db_table)} SET '
+            f'{", ".join(f"{quote(field)} = %s" for field in fields)} WHERE id = %s'
+        )
+
+        def rows():
+            for pk in ids:
+                histogram = histograms[pk]
+                count, total = stats.histogram_totals(histogram)
+                values = [count, total, *histogram]
+                if is_kitten:
+                    values += [total / count if count else 0.0, updated_at]
+                yield [*values, pk]
+
+        iterator = rows()
+        with connection.cursor() as cursor:
+            while batch := list(islice(iterator, batch_size)):
+                cursor.executemany(sql, batch)
+        return len(ids)
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kittens import ingestion
+
+
+class Command(BaseCommand):
+    help = (
+        'Write ratings left in ingestion logs by stopped processes to the database. '
+        'Run it before starting the application servers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log-dir', default=settings.KITTENS_INGESTION_LOG_DIR)
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.KITTENS_INGESTION_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = ingestion.replay_logs(options['log_dir'], options['batch_size'])
+        self.stdout.write(
+            f'replayed ratings: {written} in {time.perf_counter() - started:.1f} s'
+        )
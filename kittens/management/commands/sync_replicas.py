@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the local replica stand-ins'
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite replica stand-ins can be synced')
+        if not settings.KITTENS_REPLICA_DATABASES:
+            raise CommandError('No replicas configured, set DB_REPLICAS')
+
+        primary.ensure_connection()
+        for alias in settings.KITTENS_REPLICA_DATABASES:
+            replica = connections[alias]
+            replica.ensure_connection()
+            # Онлайн-копия через backup API, основная база не блокируется
+            primary.connection.backup(replica.connection)
+            self.stdout.write(f'{alias}: {replica.settings_dict["NAME"]}')
+        self.stdout.write(self.style.SUCCESS('Replicas synced successfully'))
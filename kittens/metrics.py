@@ -0,0 +1,204 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Показатели текущего запроса; асинхронный ORM копирует контекст в свой поток
+_current = ContextVar("kittens_request_stats", default=None)
+
+
+class RequestStats:
+    """Время и SQL-запросы одного HTTP-запроса"""
+
+    __slots__ = ("queries", "db_seconds", "render_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+@contextmanager
+def collect():
+    """Собирает показатели запросов к базе внутри блока"""
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка execute_wrapper: считает запросы и время в базе"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(connection):
+    """Подключает подсчет запросов к соединению на все время его жизни"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def format_labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с накопительными корзинами"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Счетчики корзин, затем сумма наблюдений
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            total = 0
+            bounds = [*map(format_value, self.buckets), "+Inf"]
+            for bound, count in zip(bounds, values):
+                total += count
+                labels = format_labels((*key, ("le", bound)))
+                yield f"{self.name}_bucket{{{labels}}} {total}"
+            labels = format_labels(key)
+            yield f"{self.name}_sum{{{labels}}} {format_value(values[-1])}"
+            yield f"{self.name}_count{{{labels}}} {total}"
+
+    def get_count(self, **labels):
+        series = self._series.get(tuple(sorted(labels.items())))
+        return sum(series[:-1]) if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Счетчик в формате Prometheus"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            series = dict(self._series)
+        for key, value in sorted(series.items()):
+            yield f"{self.name}{{{format_labels(key)}}} {format_value(value)}"
+
+    def get_count(self, **labels):
+        return self._series.get(tuple(sorted(labels.items())), 0)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS = Histogram(
+    "kittens_request_duration_seconds",
+    "Полное время обработки запроса",
+    SECONDS_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    "kittens_request_db_seconds",
+    "Суммарное время SQL-запросов за запрос",
+    SECONDS_BUCKETS,
+)
+RENDER_SECONDS = Histogram(
+    "kittens_request_render_seconds",
+    "Время рендеринга ответа",
+    SECONDS_BUCKETS,
+)
+QUERIES = Histogram(
+    "kittens_request_queries",
+    "Число SQL-запросов за запрос",
+    (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+RESPONSE_BYTES = Histogram(
+    "kittens_response_size_bytes",
+    "Размер тела ответа",
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+BUDGET_EXCEEDED = Counter(
+    "kittens_query_budget_exceeded_total",
+    "Запросы, превысившие бюджет числа SQL-запросов",
+)
+THROTTLED = Counter(
+    "kittens_requests_throttled_total",
+    "Запросы, отклоненные ограничением частоты (429)",
+)
+SHED = Counter(
+    "kittens_requests_shed_total",
+    "Запросы, отклоненные при занятых слотах обработки (503)",
+)
+
+REGISTRY = (
+    REQUEST_SECONDS,
+    DB_SECONDS,
+    RENDER_SECONDS,
+    QUERIES,
+    RESPONSE_BYTES,
+    BUDGET_EXCEEDED,
+    THROTTLED,
+    SHED,
+)
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def clear():
+    for metric in REGISTRY:
+        metric.clear()
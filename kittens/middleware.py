@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from kittens import cache, metrics, routers
+
+logger = logging.getLogger(__name__)
+
+
+def query_budget(request, view_name):
+    """Бюджет SQL-запросов представления для запроса
+
+    Без общего кеша JWT-аутентификация читает пользователя из БД, поэтому
+    запросу с токеном бюджет увеличивается на один запрос.
+    """
+    budget = settings.KITTENS_QUERY_BUDGETS.get(
+        view_name, settings.KITTENS_QUERY_BUDGET_DEFAULT
+    )
+    if "HTTP_AUTHORIZATION" in request.META and not cache.is_shared():
+        budget += 1
+    return budget
+
+
+def token_user_id(request):
+    """id пользователя из JWT в заголовке, без запроса к БД"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except InvalidToken:
+        return None
+    return token.get(jwt_settings.USER_ID_CLAIM)
+
+
+def request_user_id(request):
+    """id пользователя по JWT из заголовка или по сессии"""
+    if JWTAuthentication().get_header(request) is not None:
+        return token_user_id(request)
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def pin_key(user_id):
+    return f"kittens:primary:{user_id}"
+
+
+class ReplicaPinningMiddleware:
+    """Запись и чтение в течение окна после записи идут в основную базу
+
+    Окно хранится в общем кеше по id пользователя: клиенты с JWT часто не
+    сохраняют cookie, а запрос может попасть в другой процесс.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.use_primary(self.use_primary(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with routers.use_primary(self.use_primary(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    @staticmethod
+    def use_primary(request):
+        if request.method not in SAFE_METHODS:
+            return True
+        if not settings.KITTENS_REPLICA_DATABASES:
+            return False
+        user_id = request_user_id(request)
+        return user_id is not None and cache.cache.get(pin_key(user_id)) is not None
+
+    @staticmethod
+    def pin(request, response):
+        # Реплики отстают, поэтому автор изменений какое-то время читает
+        # с основной базы, чтобы сразу увидеть свою запись
+        if (
+            settings.KITTENS_REPLICA_DATABASES
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            user_id = request_user_id(request)
+            if user_id is not None:
+                cache.cache.set(
+                    pin_key(user_id), 1, settings.KITTENS_REPLICA_PIN_SECONDS
+                )
+        return response
+
+
+class PerformanceMiddleware:
+    """Время, SQL-запросы и размер ответа по представлениям
+
+    Пишет заголовок Server-Timing, гистограммы для /api/metrics/ и
+    предупреждение, если представление превысило бюджет SQL-запросов.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with metrics.collect() as stats:
+            response = self.get_response(request)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.collect() as stats:
+            response = await self.get_response(request)
+        return self.record(request, response, stats, time.perf_counter() - started)
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после представления, засекаем это время
+        stats = metrics.current()
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def record(request, response, stats, elapsed):
+        match = request.resolver_match
+        labels = {
+            "view": match.view_name if match else "unmatched",
+            "method": request.method,
+        }
+        metrics.REQUEST_SECONDS.observe(elapsed, **labels)
+        metrics.DB_SECONDS.observe(stats.db_seconds, **labels)
+        metrics.RENDER_SECONDS.observe(stats.render_seconds, **labels)
+        metrics.QUERIES.observe(stats.queries, **labels)
+        # Потоковые ответы читают базу уже после выхода из middleware
+        if not response.streaming:
+            metrics.RESPONSE_BYTES.observe(len(response.content), **labels)
+
+        budget = query_budget(request, labels["view"])
+        if stats.queries > budget:
+            metrics.BUDGET_EXCEEDED.inc(**labels)
+            logger.warning(
+                "%s %s: %d SQL queries, budget is %d",
+                request.method,
+                request.path,
+                stats.queries,
+                budget,
+            )
+
+        if settings.KITTENS_SERVER_TIMING:
+            response["Server-Timing"] = ", ".join(
+                (
+                    f"app;dur={elapsed * 1000:.1f}",
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                    f"render;dur={stats.render_seconds * 1000:.1f}",
+                )
+            )
+        return response
+
+
+class ConcurrencyLimitMiddleware:
+    """Отклоняет запросы ответом 503, когда заняты все слоты обработки
+
+    KITTENS_MAX_CONCURRENT_REQUESTS задают не больше пула соединений
+    с базой: лишний запрос сразу получает 503 вместо ожидания свободного
+    соединения до тайм-аута. Лимит действует в пределах процесса.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        limit = settings.KITTENS_MAX_CONCURRENT_REQUESTS
+        self.slots = threading.BoundedSemaphore(limit) if limit else None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.release(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self.release(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Слот занимается после разрешения URL, чтобы метрики отвечали и под нагрузкой
+        view = request.resolver_match.view_name
+        if self.slots is None or view in settings.KITTENS_CONCURRENCY_EXEMPT_VIEWS:
+            return None
+        # Без ожидания: очередь перед пулом соединений только растягивает задержки
+        if not self.slots.acquire(blocking=False):
+            metrics.SHED.inc(view=view)
+            return JsonResponse(
+                {"detail": "Сервер перегружен, повторите запрос позже."},
+                status=503,
+                headers={"Retry-After": "1"},
+            )
+        request.kittens_slot = True
+        return None
+
+    def release(self, request):
+        # Потоковый ответ освобождает слот до отправки тела
+        if getattr(request, "kittens_slot", False):
+            request.kittens_slot = False
+            self.slots.release()
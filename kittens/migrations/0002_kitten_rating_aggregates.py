@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:37
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    Kitten = apps.get_model("kittens", "Kitten")
+    Rating = apps.get_model("kittens", "Rating")
+    ratings = Rating.objects.filter(kitten=OuterRef("pk")).order_by().values("kitten")
+    Kitten.objects.update(
+        rating_count=Coalesce(
+            Subquery(ratings.annotate(value=Count("id")).values("value")), 0
+        ),
+        rating_sum=Coalesce(
+            Subquery(ratings.annotate(value=Sum("rating")).values("value")), 0
+        ),
+        average_rating=Coalesce(
+            Subquery(ratings.annotate(value=Avg("rating")).values("value")), 0.0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="kitten",
+            name="average_rating",
+            field=models.FloatField(
+                default=0, editable=False, verbose_name="Средний рейтинг"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Сумма оценок"
+            ),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
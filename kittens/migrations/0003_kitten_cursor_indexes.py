@@ -0,0 +1,29 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0002_kitten_rating_aggregates"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="kitten",
+            name="kittens_kit_age_1d1f75_idx",
+        ),
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(fields=["age", "id"], name="kittens_kit_age_33a416_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(
+                fields=["-average_rating", "id"], name="kittens_kit_average_67d0b1_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0003_kitten_cursor_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="kitten",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Изменен"),
+        ),
+    ]
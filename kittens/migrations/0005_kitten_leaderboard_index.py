@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-17 23:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0004_kitten_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(
+                fields=["breed", "-average_rating", "id"],
+                name="kittens_kit_breed_i_77b27c_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from itertools import islice
+
+from django.db import migrations
+
+from kittens import search
+
+POSTGRES_INDEX = "kittens_kitten_search_idx"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        # Выражение совпадает с SearchVector("color", "description") в search.search
+        schema_editor.execute(
+            f"CREATE INDEX {POSTGRES_INDEX} ON kittens_kitten USING gin "
+            f"(to_tsvector('{search.POSTGRES_CONFIG}'::regconfig, "
+            "COALESCE((color)::text, '') || ' ' || COALESCE((description)::text, '')))"
+        )
+    elif vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {search.FTS_TABLE} USING fts5(document)"
+        )
+        Kitten = apps.get_model("kittens", "Kitten")
+        kittens = Kitten.objects.only("color", "description").iterator(chunk_size=2000)
+        while batch := list(islice(kittens, 2000)):
+            search.index_kittens(batch, using=schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {POSTGRES_INDEX}")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {search.FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0005_kitten_leaderboard_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
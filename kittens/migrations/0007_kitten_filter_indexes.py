@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0006_kitten_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(
+                fields=["breed", "age"], name="kittens_kit_breed_i_3420be_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(
+                fields=["breed", "id"], name="kittens_kit_breed_i_993b99_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="kitten",
+            index=models.Index(fields=["color"], name="kittens_kit_color_fde636_idx"),
+        ),
+    ]
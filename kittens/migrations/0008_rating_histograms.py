@@ -0,0 +1,131 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:49
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+STAR_FIELDS = [f"stars_{value}" for value in range(1, 6)]
+
+
+def fill_rating_histograms(apps, schema_editor):
+    Breed = apps.get_model("kittens", "Breed")
+    Kitten = apps.get_model("kittens", "Kitten")
+    Rating = apps.get_model("kittens", "Rating")
+    ratings = Rating.objects.filter(kitten=OuterRef("pk")).order_by().values("kitten")
+    Kitten.objects.update(
+        **{
+            field: Coalesce(
+                Subquery(
+                    ratings.annotate(value=Count("id", filter=Q(rating=value))).values(
+                        "value"
+                    )
+                ),
+                0,
+            )
+            for value, field in enumerate(STAR_FIELDS, start=1)
+        }
+    )
+    kittens = Kitten.objects.filter(breed=OuterRef("pk")).order_by().values("breed")
+    Breed.objects.update(
+        **{
+            field: Coalesce(
+                Subquery(kittens.annotate(value=Sum(field)).values("value")), 0
+            )
+            for field in ("rating_count", "rating_sum", *STAR_FIELDS)
+        }
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("kittens", "0007_kitten_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="breed",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Сумма оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="stars_1",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 1"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="stars_2",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 2"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="stars_3",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 3"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="stars_4",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 4"
+            ),
+        ),
+        migrations.AddField(
+            model_name="breed",
+            name="stars_5",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 5"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="stars_1",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 1"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="stars_2",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 2"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="stars_3",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 3"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="stars_4",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 4"
+            ),
+        ),
+        migrations.AddField(
+            model_name="kitten",
+            name="stars_5",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок 5"
+            ),
+        ),
+        migrations.RunPython(fill_rating_histograms, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,97 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Avg, Count, F, FloatField, OuterRef, Q, Subquery,
+                              Sum)
+from django.db.models.functions import Cast, Coalesce, Now
 
 User = get_user_model()
 
+# Возможные оценки и поля гистограммы с числом оценок каждого значения
+STARS = range(1, 6)
+STAR_FIELDS = tuple(f"stars_{value}" for value in STARS)
 
-class Breed(models.Model):
+
+class RatingHistogram(models.Model):
+    """Число оценок от 1 до 5 звезд"""
+
+    stars_1 = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Оценок 1"
+    )
+    stars_2 = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Оценок 2"
+    )
+    stars_3 = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Оценок 3"
+    )
+    stars_4 = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Оценок 4"
+    )
+    stars_5 = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Оценок 5"
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating_histogram(self):
+        return tuple(getattr(self, field) for field in STAR_FIELDS)
+
+
+class BreedQuerySet(models.QuerySet):
+    """QuerySet пород с агрегатами оценок их котиков"""
+
+    def add_histogram(self, histogram):
+        """Атомарно добавляет оценки гистограммы (отрицательные вычитают)"""
+        changes = {
+            field: F(field) + count
+            for field, count in zip(STAR_FIELDS, histogram)
+            if count
+        }
+        if not changes:
+            return 0
+        return self.update(
+            rating_count=F("rating_count") + sum(histogram),
+            rating_sum=F("rating_sum")
+            + sum(value * count for value, count in zip(STARS, histogram)),
+            **changes,
+        )
+
+    def apply_deltas(self, before, after):
+        """Переносит в породы изменение гистограмм их котиков"""
+        for breed_id in before.keys() | after.keys():
+            old = before.get(breed_id, (0,) * len(STARS))
+            new = after.get(breed_id, (0,) * len(STARS))
+            self.filter(pk=breed_id).add_histogram(
+                tuple(n - o for o, n in zip(old, new))
+            )
+
+    def refresh_rating_stats(self):
+        """Пересчитывает агрегаты пород по денормализованным полям котиков"""
+        kittens = Kitten.objects.filter(breed=OuterRef("pk")).order_by().values("breed")
+        return self.update(
+            **{
+                field: Coalesce(
+                    Subquery(kittens.annotate(value=Sum(field)).values("value")), 0
+                )
+                for field in ("rating_count", "rating_sum", *STAR_FIELDS)
+            }
+        )
+
+
+class Breed(RatingHistogram):
     """Модель для пород котиков"""
 
     name = models.CharField(max_length=100, unique=True, verbose_name="Порода")
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество оценок"
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Сумма оценок"
+    )
+
+    objects = BreedQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Порода"
@@ -19,7 +102,82 @@ class Breed(models.Model):
         return self.name
 
 
-class Kitten(models.Model):
+class KittenQuerySet(models.QuerySet):
+    """QuerySet котиков с поддержкой денормализованных агрегатов рейтинга"""
+
+    def add_rating(self, value):
+        """Атомарно учитывает новую оценку в агрегатах котиков"""
+        star_field = STAR_FIELDS[value - 1]
+        return self.update(
+            **{star_field: F(star_field) + 1},
+            rating_count=F("rating_count") + 1,
+            rating_sum=F("rating_sum") + value,
+            average_rating=Cast(F("rating_sum") + value, FloatField())
+            / (F("rating_count") + 1),
+            updated_at=Now(),
+        )
+
+    def breed_histograms(self):
+        """Суммарные гистограммы оценок котиков по породам"""
+        rows = (
+            self.order_by()
+            .values("breed_id")
+            .annotate(**{field: Sum(field) for field in STAR_FIELDS})
+        )
+        return {
+            row["breed_id"]: tuple(row[field] for field in STAR_FIELDS) for row in rows
+        }
+
+    def refresh_rating_stats(self, update_breeds=True):
+        """Пересчитывает агрегаты рейтинга котиков по таблице Rating
+
+        Изменение гистограмм котиков переносится в агрегаты их пород.
+        """
+        locked = self.select_for_update().order_by("pk")
+        with transaction.atomic(using=locked.db, savepoint=False):
+            if update_breeds:
+                # Оценка, добавленная между чтениями гистограмм до и после
+                # пересчета, исказила бы разницу: строки котиков блокируются
+                # до конца транзакции
+                list(locked.values_list("pk", flat=True))
+            return self._refresh_rating_stats(update_breeds)
+
+    def _refresh_rating_stats(self, update_breeds):
+        ratings = (
+            Rating.objects.filter(kitten=OuterRef("pk")).order_by().values("kitten")
+        )
+        before = self.breed_histograms() if update_breeds else {}
+        updated = self.update(
+            rating_count=Coalesce(
+                Subquery(ratings.annotate(value=Count("id")).values("value")), 0
+            ),
+            rating_sum=Coalesce(
+                Subquery(ratings.annotate(value=Sum("rating")).values("value")), 0
+            ),
+            average_rating=Coalesce(
+                Subquery(ratings.annotate(value=Avg("rating")).values("value")), 0.0
+            ),
+            **{
+                field: Coalesce(
+                    # Условный подсчет: фильтр по rating увел бы план на индекс
+                    # оценок вместо индекса котика
+                    Subquery(
+                        ratings.annotate(
+                            value=Count("id", filter=Q(rating=value))
+                        ).values("value")
+                    ),
+                    0,
+                )
+                for value, field in zip(STARS, STAR_FIELDS)
+            },
+            updated_at=Now(),
+        )
+        if update_breeds:
+            Breed.objects.apply_deltas(before, self.breed_histograms())
+        return updated
+
+
+class Kitten(RatingHistogram):
     """Модель для котиков"""
 
     breed = models.ForeignKey(
@@ -34,18 +192,61 @@ class Kitten(models.Model):
         verbose_name="Владелец",
         related_name="kitten_owner",
     )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество оценок"
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Сумма оценок"
+    )
+    average_rating = models.FloatField(
+        default=0, editable=False, verbose_name="Средний рейтинг"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Изменен")
+
+    objects = KittenQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Котенок"
         verbose_name_plural = "Котята"
         ordering = ["age"]
         indexes = [
-            models.Index(fields=["age"]),
+            models.Index(fields=["age", "id"]),
+            models.Index(fields=["-average_rating", "id"]),
+            models.Index(fields=["breed", "-average_rating", "id"]),
+            models.Index(fields=["breed", "age"]),
+            models.Index(fields=["breed", "id"]),
+            models.Index(fields=["color"]),
         ]
 
     def __str__(self):
         return f"{self.color} котенок, {self.age} месяцев породы {self.breed}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Порода при загрузке: при ее смене оценки переносятся в новую породу
+        instance._loaded_breed_id = instance.__dict__.get("breed_id")
+        return instance
+
+
+class RatingQuerySet(models.QuerySet):
+    """QuerySet рейтингов с пакетной записью оценок"""
+
+    def upsert(self, ratings):
+        """Создает или обновляет оценки и пересчитывает агрегаты котиков"""
+        # Повторная оценка той же пары в пакете заменяет предыдущую
+        ratings = list({(r.kitten_id, r.user_id): r for r in ratings}.values())
+        self.bulk_create(
+            ratings,
+            update_conflicts=True,
+            unique_fields=["kitten", "user"],
+            update_fields=["rating"],
+        )
+        Kitten.objects.filter(
+            pk__in={rating.kitten_id for rating in ratings}
+        ).refresh_rating_stats()
+        return ratings
+
 
 class Rating(models.Model):
     """Модель для рейтинга котиков"""
@@ -66,6 +267,8 @@ class Rating(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)], verbose_name="Рейтинг"
     )
 
+    objects = RatingQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рейтинг"
         verbose_name_plural = "Рейтинги"
@@ -0,0 +1,151 @@
+import json
+import math
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+from kittens.serializers import MAX_ID
+
+
+class KittenCursorPagination(CursorPagination):
+    """Keyset-пагинация котиков без COUNT(*) и OFFSET-сканирования
+
+    Позиция курсора — значения всех полей сортировки вместе с id, поэтому
+    она уникальна и страница начинается сразу за последней строкой
+    предыдущей, даже если значения поля сортировки повторяются.
+    """
+
+    ordering = ("id",)
+    # Допустимые сортировки, каждой соответствует составной индекс
+    orderings = {
+        "id": ("id",),
+        "age": ("age", "id"),
+        "-average_rating": ("-average_rating", "id"),
+    }
+    # Параметр ordering занят сортировкой фильтров списка
+    ordering_query_param = "cursor_ordering"
+    page_size_query_param = "page_size"
+    max_page_size = settings.KITTENS_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_query_param)
+        return self.orderings.get(value, self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, position = False, None
+        else:
+            _, reverse, position = self.cursor
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        # Лишняя строка показывает, есть ли следующая страница
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        following = None
+        if len(results) > self.page_size:
+            following = self._get_position_from_instance(results[-1], self.ordering)
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = following is not None
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next = following is not None
+            self.has_previous = position is not None
+            self.next_position, self.previous_position = following, position
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def keyset_filter(self, ordering, position):
+        """Строки после позиции в порядке ordering
+
+        Условие (f1 >= v1) AND (f1 > v1 OR ...) начинает чтение индекса
+        с позиции курсора, а не отбрасывает строки OFFSET-ом.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Курсор приходит от клиента: все поля сортировки числовые
+        if not all(self.is_position_value(value) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        condition = None
+        for field, value in reversed(list(zip(ordering, values))):
+            name = field.lstrip("-")
+            after, from_ = ("lt", "lte") if field.startswith("-") else ("gt", "gte")
+            strict = Q(**{f"{name}__{after}": value})
+            if condition is None:
+                condition = strict
+            else:
+                condition = Q(**{f"{name}__{from_}": value}) & (strict | condition)
+        return condition
+
+    @staticmethod
+    def is_position_value(value):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return math.isfinite(value) and abs(value) <= MAX_ID
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Быстрый режим сериализации отдает строки values() вместо моделей
+        if isinstance(instance, dict):
+            values = [instance[field.lstrip("-")] for field in ordering]
+        else:
+            values = [getattr(instance, field.lstrip("-")) for field in ordering]
+        return json.dumps(values)
+
+
+def estimate_count(model, using="default"):
+    """Приблизительное число строк таблицы без COUNT(*) или None"""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # Статистика планировщика, обновляется VACUUM и ANALYZE
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            # Наибольший rowid по индексу; удаленные строки завышают оценку
+            cursor.execute(f"SELECT MAX(rowid) FROM {table}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки с оценкой размера большой таблицы без фильтров"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if (
+                estimate is not None
+                and estimate >= settings.KITTENS_ADMIN_ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
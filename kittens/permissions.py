@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -10,4 +13,15 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
         # Права на запись разрешены только автору сообщения или администратору
-        return obj.owner == request.user or request.user.is_staff
+        return obj.owner_id == request.user.pk or request.user.is_staff
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """Доступ к метрикам по статическому токену сборщика"""
+
+    def has_permission(self, request, view):
+        token = settings.KITTENS_METRICS_TOKEN
+        if not token:
+            return True
+        header = request.headers.get("Authorization", "")
+        return hmac.compare_digest(header.encode(), f"Bearer {token}".encode())
@@ -0,0 +1,45 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Запрос читает с основной базы: он пишет или недавно писал
+_use_primary = ContextVar("kittens_use_primary", default=False)
+
+
+@contextmanager
+def use_primary(enabled=True):
+    """Направляет чтение внутри блока на основную базу"""
+    token = _use_primary.set(enabled)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def reads_from_replica():
+    """Чтение в текущем контексте идет с реплики"""
+    # Внутри транзакции реплика не видит незакоммиченных изменений
+    return bool(
+        settings.KITTENS_REPLICA_DATABASES
+        and not _use_primary.get()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class PrimaryReplicaRouter:
+    """Чтение с реплик, запись и чтение после записи с основной базы"""
+
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.KITTENS_REPLICA_DATABASES)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
@@ -0,0 +1,192 @@
+import re
+from functools import lru_cache
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Таблица полнотекстового индекса SQLite (FTS5), rowid совпадает с id котика
+FTS_TABLE = "kittens_kitten_fts"
+# Конфигурация полнотекстового поиска PostgreSQL
+POSTGRES_CONFIG = "russian"
+
+VOWELS = "аеиоуыэюя"
+WORD_RE = re.compile(r"\w+")
+
+
+def _endings(*groups):
+    """Окончания по убыванию длины; True означает окончание только после а/я"""
+    endings = [
+        (ending, after_a) for after_a, group in groups for ending in group.split()
+    ]
+    return sorted(endings, key=lambda item: len(item[0]), reverse=True)
+
+
+PERFECTIVE_GERUND = _endings(
+    (True, "в вши вшись"), (False, "ив ивши ившись ыв ывши ывшись")
+)
+ADJECTIVE = _endings(
+    (
+        False,
+        "ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому их ых ую юю "
+        "ая яя ою ею",
+    )
+)
+PARTICIPLE = _endings((True, "ем нн вш ющ щ"), (False, "ивш ывш ующ"))
+REFLEXIVE = _endings((False, "ся сь"))
+VERB = _endings(
+    (True, "ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно"),
+    (
+        False,
+        "ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено ят ует "
+        "уют ит ыт ены ить ыть ишь ую ю",
+    ),
+)
+NOUN = _endings(
+    (
+        False,
+        "а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием ем ам ом о у "
+        "ах иях ях ы ь ию ью ю ия ья я",
+    )
+)
+SUPERLATIVE = _endings((False, "ейш ейше"))
+DERIVATIONAL = _endings((False, "ост ость"))
+
+
+def _strip(word, endings):
+    """Отрезает самое длинное подходящее окончание или возвращает None"""
+    for ending, after_a in endings:
+        if word.endswith(ending):
+            stem = word[: -len(ending)]
+            if after_a and not stem.endswith(("а", "я")):
+                return None
+            return stem
+    return None
+
+
+def _region(word, start=0):
+    """Начало области после первого сочетания гласной с согласной"""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+@lru_cache(maxsize=100_000)
+def stem(word):
+    """Основа русского слова по алгоритму Портера (Snowball)"""
+    word = word.lower().replace("ё", "е")
+    rv = next((i + 1 for i, char in enumerate(word) if char in VOWELS), len(word))
+    r2 = _region(word, _region(word))
+    prefix, rest = word[:rv], word[rv:]
+
+    # Шаг 1: деепричастие, иначе возвратная частица и прилагательное,
+    # глагол или существительное
+    stripped = _strip(rest, PERFECTIVE_GERUND)
+    if stripped is None:
+        stripped = _strip(rest, REFLEXIVE)
+        if stripped is not None:
+            rest = stripped
+        stripped = _strip(rest, ADJECTIVE)
+        if stripped is not None:
+            participle = _strip(stripped, PARTICIPLE)
+            if participle is not None:
+                stripped = participle
+        else:
+            stripped = _strip(rest, VERB)
+            if stripped is None:
+                stripped = _strip(rest, NOUN)
+    if stripped is not None:
+        rest = stripped
+
+    # Шаг 2
+    if rest.endswith("и"):
+        rest = rest[:-1]
+
+    # Шаг 3: словообразовательное окончание в области R2
+    stripped = _strip(rest, DERIVATIONAL)
+    if stripped is not None and len(prefix) + len(stripped) >= r2:
+        rest = stripped
+
+    # Шаг 4
+    if rest.endswith("нн"):
+        rest = rest[:-1]
+    else:
+        stripped = _strip(rest, SUPERLATIVE)
+        if stripped is not None:
+            rest = stripped[:-1] if stripped.endswith("нн") else stripped
+        elif rest.endswith("ь"):
+            rest = rest[:-1]
+    return prefix + rest
+
+
+def tokenize(text):
+    """Основы слов текста в нижнем регистре"""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+def kitten_document(kitten):
+    """Текст котика для полнотекстового индекса"""
+    return " ".join(tokenize(f"{kitten.color} {kitten.description}"))
+
+
+def uses_fts(using):
+    """Используется ли индекс FTS5 для базы данных"""
+    return connections[using].vendor == "sqlite"
+
+
+def index_kittens(kittens, using="default"):
+    """Добавляет или обновляет котиков в индексе FTS5"""
+    if not uses_fts(using):
+        return
+    rows = [(kitten.pk, kitten_document(kitten)) for kitten in kittens]
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)",
+            rows,
+        )
+
+
+def remove_kittens(ids, using="default"):
+    """Удаляет котиков из индекса FTS5"""
+    if not uses_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in ids]
+        )
+
+
+def search(queryset, text):
+    """Котики, подходящие под поисковый запрос, по убыванию релевантности"""
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        stems = tokenize(text)
+        if not stems:
+            return queryset
+        # Каждая основа ищется как префикс, все основы должны встретиться
+        match = " ".join(f'"{stem}"*' for stem in stems)
+        table = queryset.model._meta.db_table
+        # Унарный плюс не дает планировщику перебирать котиков и выполнять
+        # MATCH для каждого: соединение всегда начинается с индекса FTS5
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE} MATCH %s", f"{table}.id = +{FTS_TABLE}.rowid"],
+            params=[match],
+        ).order_by(RawSQL(f"{FTS_TABLE}.rank", ()), "id")
+    if vendor == "postgresql":
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+
+        # Выражение совпадает с GIN-индексом kittens_kitten_search_idx
+        vector = SearchVector("color", "description", config=POSTGRES_CONFIG)
+        query = SearchQuery(text, config=POSTGRES_CONFIG)
+        return (
+            queryset.alias(search_document=vector)
+            .filter(search_document=query)
+            .order_by(SearchRank(vector, query).desc(), "id")
+        )
+    condition = Q()
+    for word in WORD_RE.findall(text):
+        condition &= Q(color__icontains=word) | Q(description__icontains=word)
+    return queryset.filter(condition)
@@ -1,7 +1,16 @@
+import time
+
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from kittens import breeds, stats
+from kittens.models import STAR_FIELDS, Breed, Kitten, Rating
 
-from kittens.models import Breed, Kitten, Rating
+# Верхняя граница BigAutoField: большее число не помещается в запрос к БД
+MAX_ID = 2**63 - 1
 
 
 class BreedSerializer(serializers.ModelSerializer):
@@ -12,10 +21,79 @@ class BreedSerializer(serializers.ModelSerializer):
         fields = ["id", "name"]
 
 
+def breed_data(context, breed_id):
+    """Порода котика из справочника процесса вместо JOIN с таблицей пород
+
+    Снимок справочника сохраняется в контексте и один раз берется на ответ.
+    """
+    catalog = context.get("breeds")
+    if catalog is None or breed_id not in catalog:
+        catalog = context["breeds"] = breeds.get_breeds((breed_id,))
+    breed = catalog.get(breed_id)
+    return {"id": breed_id, "name": breed.name if breed else None}
+
+
+@extend_schema_field(BreedSerializer)
+class BreedField(serializers.Field):
+    """Вывод породы котика по breed_id"""
+
+    def __init__(self, **kwargs):
+        kwargs.update(source="breed_id", read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return breed_data(self.context, value)
+
+
+class BreedPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Поле породы, проверяемое по справочнику пород без запроса к БД"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("queryset", Breed.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        # Массовое создание заранее загружает справочник со всеми породами запроса
+        catalog = self.context.get("breeds")
+        if catalog is None:
+            catalog = breeds.get_breeds((pk,))
+        if pk not in catalog:
+            self.fail("does_not_exist", pk_value=data)
+        return catalog[pk]
+
+
+class BreedStatsSerializer(serializers.ModelSerializer):
+    """Сериализатор пород со статистикой оценок их котиков"""
+
+    rating_stats = serializers.SerializerMethodField()
+
+    def get_rating_stats(self, obj) -> dict:
+        return stats.rating_stats(
+            obj.rating_count, obj.rating_sum, obj.rating_histogram
+        )
+
+    class Meta:
+        model = Breed
+        fields = ["id", "name", "rating_stats"]
+
+
 class RatingSerializer(serializers.ModelSerializer):
     """Сериализатор для рейтинга котиков"""
 
-    user = serializers.ReadOnlyField(source="user.username")
+    user = serializers.SerializerMethodField()
+
+    def get_user(self, obj) -> str:
+        # Имя текущего пользователя берется из токена без запроса к БД
+        request = self.context.get("request")
+        if request is not None and obj.user_id == request.user.pk:
+            return request.user.username
+        return obj.user.username
 
     def validate_rating(self, value):
         if value < 1 or value > 5:
@@ -30,12 +108,16 @@ class RatingSerializer(serializers.ModelSerializer):
 class BaseKittenSerializer(serializers.ModelSerializer):
     """Базовый сериализатор для котиков"""
 
-    breed = BreedSerializer(read_only=True)
+    breed = BreedField()
     age = serializers.IntegerField(
         validators=[MinValueValidator(1), MaxValueValidator(255)],
     )
     owner = serializers.ReadOnlyField(source="owner.username")
-    average_rating = serializers.FloatField(read_only=True)
+    average_rating = serializers.SerializerMethodField()
+
+    def get_average_rating(self, obj) -> float | None:
+        # Котик без оценок не имеет среднего рейтинга
+        return obj.average_rating if obj.rating_count else None
 
     class Meta:
         model = Kitten
@@ -61,15 +143,80 @@ class KittenDetailSerializer(BaseKittenSerializer):
     """Сериализатор для детального просмотра котиков"""
 
     ratings = RatingSerializer(source="rating_kitten", many=True, read_only=True)
+    rating_stats = serializers.SerializerMethodField()
+
+    def get_rating_stats(self, obj) -> dict:
+        return stats.rating_stats(
+            obj.rating_count, obj.rating_sum, obj.rating_histogram
+        )
 
     class Meta(BaseKittenSerializer.Meta):
-        fields = BaseKittenSerializer.Meta.fields + ["ratings"]
+        fields = BaseKittenSerializer.Meta.fields + ["ratings", "rating_stats"]
+
+
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Параметры запроса рейтинга лучших котиков"""
+
+    breed = serializers.IntegerField(required=False, min_value=1, max_value=MAX_ID)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=settings.KITTENS_LEADERBOARD_MAX_LIMIT, default=10
+    )
+
+
+class KittenRowSerializer(serializers.BaseSerializer):
+    """Быстрый сериализатор котиков из строк values() с выводом как у KittenSerializer"""
+
+    fields = (
+        "id",
+        "breed_id",
+        "color",
+        "age",
+        "description",
+        "owner__username",
+        "rating_count",
+        "average_rating",
+    )
+
+    def to_representation(self, row):
+        return {
+            "id": row["id"],
+            "breed": breed_data(self.context, row["breed_id"]),
+            "color": row["color"],
+            "age": row["age"],
+            "description": row["description"],
+            "owner": row["owner__username"],
+            "average_rating": row["average_rating"] if row["rating_count"] else None,
+        }
+
+
+class KittenDetailRowSerializer(KittenRowSerializer):
+    """Быстрый сериализатор котика с выводом как у KittenDetailSerializer"""
+
+    fields = KittenRowSerializer.fields + ("rating_sum", *STAR_FIELDS)
+
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        # Асинхронное представление загружает оценки заранее
+        ratings = row.get("ratings")
+        if ratings is None:
+            ratings = Rating.objects.filter(kitten_id=row["id"]).values_list(
+                "user__username", "rating"
+            )
+        data["ratings"] = [
+            {"user": username, "rating": rating} for username, rating in ratings
+        ]
+        data["rating_stats"] = stats.rating_stats(
+            row["rating_count"],
+            row["rating_sum"],
+            tuple(row[field] for field in STAR_FIELDS),
+        )
+        return data
 
 
 class KittenCreateUpdateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания/изменения котиков"""
 
-    breed = serializers.PrimaryKeyRelatedField(queryset=Breed.objects.all())
+    breed = BreedPrimaryKeyField()
     age = serializers.IntegerField(
         validators=[
             MinValueValidator(1),
@@ -83,7 +230,99 @@ class KittenCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Возраст должен быть не менее 1 месяца.")
         return value
 
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Агрегаты оценок меняются запросами в обход экземпляра, поэтому
+        # сохраняются только поля из запроса: иначе оценки, добавленные
+        # после загрузки котика, потерялись бы
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
     class Meta:
         model = Kitten
         fields = ["breed", "color", "age", "description"]
         read_only_fields = ["owner"]
+
+
+def _collect_ids(data, field):
+    """Собирает идентификаторы из элементов массива для одного запроса к БД"""
+    ids = set()
+    for item in data if isinstance(data, list) else []:
+        try:
+            value = int(item.get(field))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if 0 < value <= MAX_ID:
+            ids.add(value)
+    return ids
+
+
+class KittenBulkCreateListSerializer(serializers.ListSerializer):
+    """Сериализатор для массового создания котиков"""
+
+    def to_internal_value(self, data):
+        # Неизвестные породы запроса перечитывают справочник один раз
+        self._context["breeds"] = breeds.get_breeds(_collect_ids(data, "breed"))
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        return Kitten.objects.bulk_create(Kitten(**attrs) for attrs in validated_data)
+
+
+class KittenBulkCreateSerializer(KittenCreateUpdateSerializer):
+    """Сериализатор элемента массового создания котиков"""
+
+    class Meta(KittenCreateUpdateSerializer.Meta):
+        fields = ["id"] + KittenCreateUpdateSerializer.Meta.fields
+        list_serializer_class = KittenBulkCreateListSerializer
+
+
+class RatingBulkListSerializer(serializers.ListSerializer):
+    """Сериализатор для пакетной записи оценок"""
+
+    def to_internal_value(self, data):
+        # Существование всех котиков проверяется одним запросом
+        self._context["kitten_ids"] = set(
+            Kitten.objects.filter(pk__in=_collect_ids(data, "kitten")).values_list(
+                "pk", flat=True
+            )
+        )
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        return Rating.objects.upsert(Rating(**attrs) for attrs in validated_data)
+
+
+class RatingBulkSerializer(RatingSerializer):
+    """Сериализатор элемента пакетной записи оценок"""
+
+    kitten = serializers.IntegerField(source="kitten_id", min_value=1, max_value=MAX_ID)
+
+    def validate_kitten(self, value):
+        if value not in self.context["kitten_ids"]:
+            raise serializers.ValidationError(
+                serializers.PrimaryKeyRelatedField.default_error_messages[
+                    "does_not_exist"
+                ].format(pk_value=value)
+            )
+        return value
+
+    class Meta(RatingSerializer.Meta):
+        fields = ["kitten"] + RatingSerializer.Meta.fields
+        list_serializer_class = RatingBulkListSerializer
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Сериализатор выдачи токенов с данными пользователя в claims"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["username"] = user.username
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        # Точное время выдачи claims: iat округлен до секунды, а токены
+        # доступа, обновленные по этому токену, получают новый iat
+        token["auth_time"] = time.time()
+        return token
@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from kittens import cache, metrics, search
+from kittens.authentication import revoke_tokens
+from kittens.models import STAR_FIELDS, STARS, Breed, Kitten, Rating
+
+
+def _deleted_with_kitten(origin):
+    """Проверяет, удаляется ли рейтинг каскадно вместе с котиком"""
+    if isinstance(origin, QuerySet):
+        return origin.model is Kitten
+    return isinstance(origin, Kitten)
+
+
+@receiver(post_save, sender=Rating)
+def update_kitten_rating_on_save(sender, instance, created, **kwargs):
+    kittens = Kitten.objects.filter(pk=instance.kitten_id)
+    if created:
+        kittens.add_rating(instance.rating)
+        Breed.objects.filter(kittens=instance.kitten_id).add_histogram(
+            tuple(int(value == instance.rating) for value in STARS)
+        )
+    else:
+        kittens.refresh_rating_stats()
+
+
+@receiver(post_delete, sender=Rating)
+def update_kitten_rating_on_delete(sender, instance, origin=None, **kwargs):
+    # При удалении котика его агрегаты пересчитывать не нужно
+    if _deleted_with_kitten(origin):
+        return
+    Kitten.objects.filter(pk=instance.kitten_id).refresh_rating_stats()
+
+
+@receiver(post_save, sender=Kitten)
+def move_kitten_ratings_to_breed(sender, instance, created, **kwargs):
+    loaded_breed_id = getattr(instance, "_loaded_breed_id", None)
+    if created or loaded_breed_id in (None, instance.breed_id):
+        return
+    # Гистограмма экземпляра могла устареть или не загружаться, поэтому
+    # обе породы пересчитываются по текущим строкам котиков
+    Breed.objects.filter(
+        pk__in=(loaded_breed_id, instance.breed_id)
+    ).refresh_rating_stats()
+    instance._loaded_breed_id = instance.breed_id
+
+
+@receiver(pre_delete, sender=Kitten)
+def remove_kitten_ratings_from_breed(sender, instance, origin=None, **kwargs):
+    # Оценки удаляются каскадно, поэтому гистограмма котика вычитается из породы.
+    # Сигнал выполняется в транзакции удаления: гистограмма перечитывается под
+    # блокировкой, копия в экземпляре могла устареть после новой оценки
+    rows = list(
+        Kitten.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values_list(*STAR_FIELDS)
+    )
+    if not rows:
+        return
+    (histogram,) = rows
+    if any(histogram):
+        Breed.objects.filter(pk=instance.breed_id).add_histogram(
+            tuple(-count for count in histogram)
+        )
+    if not _deleted_with_kitten(origin):
+        # Каскад от пользователя пересчитает котика после удаления его оценок,
+        # обнуленная гистограмма не даст вычесть их из породы второй раз
+        Kitten.objects.filter(pk=instance.pk).update(
+            **{field: 0 for field in STAR_FIELDS}
+        )
+
+
+@receiver(post_save, sender=Breed)
+@receiver(post_delete, sender=Breed)
+def invalidate_breed_cache(sender, instance, using="default", **kwargs):
+    # Название породы выводится и в списке котиков; справочник пород,
+    # перечитанный до фиксации транзакции, тоже обновляется после нее
+    cache.bump_version_on_commit(
+        cache.BREED_CATALOG, cache.BREEDS, cache.KITTENS, using=using
+    )
+
+
+@receiver(post_save, sender=Kitten)
+@receiver(post_delete, sender=Kitten)
+def invalidate_kitten_cache(sender, instance, using="default", **kwargs):
+    cache.bump_version_on_commit(
+        cache.KITTENS, cache.kitten_namespace(instance.pk), using=using
+    )
+
+
+@receiver(post_save, sender=Kitten)
+def index_kitten(sender, instance, update_fields=None, using="default", **kwargs):
+    if update_fields is not None and not {"color", "description"} & update_fields:
+        return
+    search.index_kittens([instance], using=using)
+
+
+@receiver(post_delete, sender=Kitten)
+def unindex_kitten(sender, instance, using="default", **kwargs):
+    search.remove_kittens([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_rating_cache(sender, instance, origin=None, using="default", **kwargs):
+    if _deleted_with_kitten(origin):
+        return
+    cache.bump_version_on_commit(
+        cache.KITTENS, cache.kitten_namespace(instance.kitten_id), using=using
+    )
+
+
+# Права пользователя, которые токен несет в подписанных claims
+TOKEN_ROLE_FIELDS = ("is_staff", "is_superuser")
+
+
+def _token_roles(user):
+    return tuple(user.__dict__.get(field) for field in TOKEN_ROLE_FIELDS)
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_token_roles(sender, instance, **kwargs):
+    instance._loaded_token_roles = _token_roles(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_stale_user_tokens(sender, instance, created, **kwargs):
+    # Токены выданы с прежними правами и паролем: после их изменения
+    # они действуют только до повторного входа. _password задан при
+    # смене пароля, но не при обновлении хеша во время входа
+    changed = (
+        not instance.is_active
+        or instance._password is not None
+        or _token_roles(instance) != instance._loaded_token_roles
+    )
+    if changed and not created:
+        revoke_tokens(instance.pk)
+    instance._loaded_token_roles = _token_roles(instance)
+
+
+@receiver(post_delete, sender=get_user_model())
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_tokens(instance.pk)
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.KITTENS_SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    metrics.install_query_wrapper(connection)
@@ -0,0 +1,115 @@
+from itertools import chain
+
+from django.conf import settings
+
+from kittens.models import STAR_FIELDS, STARS, Breed, Kitten, Rating
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy является необязательной зависимостью
+    np = None
+
+# Размер пачки строк при полном чтении таблиц
+SCAN_CHUNK_SIZE = 10000
+
+
+def bayesian_average(count, total):
+    """Средняя оценка, сглаженная к априорной при малом числе оценок"""
+    weight = settings.KITTENS_RATING_PRIOR_WEIGHT
+    if count + weight == 0:
+        return None
+    return (settings.KITTENS_RATING_PRIOR_MEAN * weight + total) / (count + weight)
+
+
+def rating_stats(count, total, histogram):
+    """Статистика оценок для ответа API"""
+    return {
+        "count": count,
+        "average": total / count if count else None,
+        "bayesian_average": bayesian_average(count, total),
+        "distribution": {str(value): n for value, n in zip(STARS, histogram)},
+    }
+
+
+def histogram_totals(histogram):
+    """Число и сумма оценок гистограммы"""
+    count = sum(histogram)
+    return count, sum(value * n for value, n in zip(STARS, histogram))
+
+
+def scan(queryset, fields):
+    """Плоский поток значений полей всех строк таблицы"""
+    rows = queryset.order_by().values_list(*fields)
+    return chain.from_iterable(rows.iterator(chunk_size=SCAN_CHUNK_SIZE))
+
+
+def compute_histograms(using="default", vectorized=True):
+    """Гистограммы оценок всех котиков и пород по полному чтению таблиц
+
+    Возвращает словари {id: (оценок 1, ..., оценок 5)}. С numpy подсчет
+    выполняется векторно, без него — циклом на Python.
+    """
+    ratings = scan(Rating.objects.using(using), ("kitten_id", "rating"))
+    kittens = scan(Kitten.objects.using(using), ("id", "breed_id"))
+    breed_ids = Breed.objects.using(using).values_list("id", flat=True)
+    if vectorized and np is not None:
+        return _compute_numpy(ratings, kittens, breed_ids)
+    return _compute_python(ratings, kittens, breed_ids)
+
+
+def _compute_numpy(ratings, kittens, breed_ids):
+    ratings = np.fromiter(ratings, dtype=np.int64).reshape(-1, 2)
+    kittens = np.fromiter(kittens, dtype=np.int64).reshape(-1, 2)
+    breeds = np.sort(np.fromiter(breed_ids, dtype=np.int64))
+    kittens = kittens[np.argsort(kittens[:, 0])]
+    kitten_ids, kitten_breeds = kittens[:, 0], kittens[:, 1]
+
+    # Строка матрицы котика для каждой оценки, столбец — значение оценки
+    rows = np.searchsorted(kitten_ids, ratings[:, 0])
+    cells = rows * len(STARS) + ratings[:, 1] - STARS[0]
+    kitten_counts = np.bincount(cells, minlength=len(kitten_ids) * len(STARS))
+    kitten_counts = kitten_counts.reshape(-1, len(STARS))
+
+    breed_counts = np.zeros((len(breeds), len(STARS)), dtype=np.int64)
+    np.add.at(breed_counts, np.searchsorted(breeds, kitten_breeds), kitten_counts)
+    return (
+        dict(zip(kitten_ids.tolist(), map(tuple, kitten_counts.tolist()))),
+        dict(zip(breeds.tolist(), map(tuple, breed_counts.tolist()))),
+    )
+
+
+def _compute_python(ratings, kittens, breed_ids):
+    # zip одного итератора с самим собой разбивает плоский поток на пары
+    kitten_breeds = dict(zip(kittens, kittens))
+    kitten_counts = {kitten_id: [0] * len(STARS) for kitten_id in kitten_breeds}
+    for kitten_id, rating in zip(ratings, ratings):
+        kitten_counts[kitten_id][rating - STARS[0]] += 1
+
+    breed_counts = {breed_id: [0] * len(STARS) for breed_id in breed_ids}
+    for kitten_id, counts in kitten_counts.items():
+        totals = breed_counts[kitten_breeds[kitten_id]]
+        for index, count in enumerate(counts):
+            totals[index] += count
+    return (
+        {kitten_id: tuple(counts) for kitten_id, counts in kitten_counts.items()},
+        {breed_id: tuple(counts) for breed_id, counts in breed_counts.items()},
+    )
+
+
+def find_stale(queryset, histograms):
+    """id строк, сохраненные агрегаты которых расходятся с гистограммами"""
+    fields = ["id", "rating_count", "rating_sum", *STAR_FIELDS]
+    has_average = queryset.model is Kitten
+    if has_average:
+        fields.append("average_rating")
+    rows = queryset.order_by("id").values_list(*fields)
+    stale = []
+    for row in rows.iterator(chunk_size=SCAN_CHUNK_SIZE):
+        histogram = histograms[row[0]]
+        count, total = histogram_totals(histogram)
+        expected = (count, total, *histogram)
+        if tuple(row[1 : len(expected) + 1]) != expected or (
+            has_average and abs(row[-1] - (total / count if count else 0.0)) > 1e-9
+        ):
+            stale.append(row[0])
+    return stale
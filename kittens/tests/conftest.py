@@ -0,0 +1,38 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from kittens import cache as response_cache
+from kittens.models import Breed
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Кеш ответов не откатывается вместе с транзакцией теста
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    """Кеш считается общим для процессов, как Redis в продакшене"""
+    monkeypatch.setattr(response_cache, "is_shared", lambda: True)
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="testuser", password="password")
+
+
+@pytest.fixture
+def breed():
+    return Breed.objects.create(name="Сиамская")
@@ -0,0 +1,125 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def admin_client():
+    client = Client()
+    client.force_login(
+        User.objects.create_superuser(username="admin", password="password")
+    )
+    return client
+
+
+@pytest.fixture
+def breeds():
+    return [Breed.objects.create(name=name) for name in ("Сиамская", "Сфинкс")]
+
+
+def create_kittens(breeds, count):
+    owners = [
+        User.objects.create_user(username=f"owner{User.objects.count()}_{i}")
+        for i in range(3)
+    ]
+    kittens = Kitten.objects.bulk_create(
+        Kitten(
+            breed=breeds[i % 2],
+            color=("Серый", "Белый")[i % 2],
+            age=1 + i % 15,
+            description="Котенок",
+            owner=owners[i % 3],
+        )
+        for i in range(count)
+    )
+    Rating.objects.bulk_create(
+        Rating(kitten=kitten, user=owners[i % 3], rating=1 + i % 5)
+        for i, kitten in enumerate(kittens)
+    )
+    return kittens
+
+
+def changelist_queries(admin_client, url, params=None):
+    with CaptureQueriesContext(connection) as captured:
+        response = admin_client.get(url, params)
+    assert response.status_code == 200
+    return captured
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/admin/kittens/kitten/", "/admin/kittens/rating/"])
+def test_changelist_queries_do_not_grow_with_rows(admin_client, breeds, url):
+    """Число запросов страницы списка не зависит от числа строк"""
+    create_kittens(breeds, 3)
+    few = len(changelist_queries(admin_client, url))
+    create_kittens(breeds, 40)
+    assert len(changelist_queries(admin_client, url)) == few
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url, params, expected",
+    [
+        ("/admin/kittens/kitten/", {"color": "Белый"}, 5),
+        ("/admin/kittens/kitten/", {"age": "13-"}, 0),
+        ("/admin/kittens/kitten/", {"owner": "{owner}"}, 4),
+        ("/admin/kittens/rating/", {"kitten": "{kitten}"}, 1),
+        ("/admin/kittens/rating/", {"user": "{owner}"}, 4),
+        ("/admin/kittens/rating/", {"rating": 5}, 2),
+    ],
+)
+def test_changelist_filters(admin_client, breeds, url, params, expected):
+    """Проверка фильтров с полем ввода и фиксированными вариантами"""
+    kittens = create_kittens(breeds, 10)
+    params = {
+        name: str(value).format(owner=kittens[0].owner.username, kitten=kittens[0].id)
+        for name, value in params.items()
+    }
+    response = admin_client.get(url, params)
+    assert response.status_code == 200
+    assert response.context["cl"].result_count == expected
+
+
+@pytest.mark.django_db
+def test_changelist_invalid_filter_value(admin_client, breeds):
+    """Некорректный id котенка не приводит к ошибке сервера"""
+    response = admin_client.get("/admin/kittens/rating/", {"kitten": "котенок"})
+    assert response.status_code == 302
+    assert response["Location"].endswith("?e=1")
+
+
+@pytest.mark.django_db
+def test_changelist_estimated_count(admin_client, breeds, settings):
+    """Большая таблица без фильтров не считается через COUNT(*)"""
+    kittens = create_kittens(breeds, 10)
+    Kitten.objects.filter(pk=kittens[0].pk).delete()
+    settings.KITTENS_ADMIN_ESTIMATED_COUNT_THRESHOLD = 5
+
+    captured = changelist_queries(admin_client, "/admin/kittens/kitten/")
+    assert not [q for q in captured if "COUNT(*)" in q["sql"]]
+    # Оценка по наибольшему id учитывает удаленную строку
+    response = admin_client.get("/admin/kittens/kitten/")
+    assert response.context["cl"].result_count == kittens[-1].id
+
+    # С фильтром число строк считается точно
+    response = admin_client.get("/admin/kittens/kitten/", {"color": "Серый"})
+    assert response.context["cl"].result_count == 4
+
+
+@pytest.mark.django_db
+def test_kitten_changelist_search(admin_client, breeds):
+    """Поиск в админке использует полнотекстовый индекс"""
+    kittens = create_kittens(breeds, 3)
+    kittens[1].description = "Пушистый рыжик"
+    kittens[1].save()
+
+    response = admin_client.get("/admin/kittens/kitten/", {"q": "пушистые"})
+    assert [kitten.id for kitten in response.context["cl"].result_list] == [
+        kittens[1].id
+    ]
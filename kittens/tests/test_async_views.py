@@ -0,0 +1,97 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def kittens():
+    user = User.objects.create_user(username="testuser", password="password")
+    other = User.objects.create_user(username="otheruser", password="password")
+    breeds = [Breed.objects.create(name=name) for name in ("Сиамская", "Сфинкс")]
+    kittens = [
+        Kitten.objects.create(
+            breed=breeds[i % 2],
+            color="Серый",
+            age=1 + i,
+            description="Игривый котёнок",
+            owner=user,
+        )
+        for i in range(7)
+    ]
+    Rating.objects.create(kitten=kittens[0], user=user, rating=5)
+    Rating.objects.create(kitten=kittens[0], user=other, rating=2)
+    return kittens
+
+
+def get_both(path, params=None):
+    """Ответы синхронного DRF-представления и его асинхронной версии"""
+    sync_response = APIClient().get(f"/api/{path}", params)
+    async_response = async_to_sync(AsyncClient().get)(f"/api/async/{path}", params)
+    return sync_response, async_response
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "path, params",
+    [
+        ("", None),
+        ("", {"page": 2}),
+        ("", {"breed": "{breed}"}),
+        ("{kitten}/", None),
+        ("breeds/", None),
+    ],
+)
+def test_async_views_match_sync_views(kittens, path, params):
+    """Асинхронные представления отдают те же данные, что и синхронные"""
+    path = path.format(kitten=kittens[0].id)
+    if params and "breed" in params:
+        params = {"breed": kittens[0].breed_id}
+    sync_response, async_response = get_both(path, params)
+
+    assert async_response.status_code == sync_response.status_code == 200
+    assert async_response["Content-Type"] == sync_response["Content-Type"]
+    expected = sync_response.json()
+    if "next" in expected:
+        # Ссылки на страницы указывают на свои адреса
+        for link in ("next", "previous"):
+            if expected[link]:
+                expected[link] = expected[link].replace("/api/", "/api/async/")
+    assert async_response.json() == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "path, params, status_code",
+    [
+        ("", {"page": 3}, 404),
+        ("", {"breed": 999}, 400),
+        ("999/", None, 404),
+    ],
+)
+def test_async_views_errors_match_sync_views(kittens, path, params, status_code):
+    """Ошибки асинхронных представлений совпадают с синхронными"""
+    sync_response, async_response = get_both(path, params)
+    assert async_response.status_code == sync_response.status_code == status_code
+    assert async_response.json() == sync_response.json()
+
+
+@pytest.mark.django_db
+def test_async_views_are_read_only(kittens):
+    """Асинхронные представления принимают только чтение"""
+    response = async_to_sync(AsyncClient().post)("/api/async/", {})
+    assert response.status_code == 405
+
+
+@pytest.mark.django_db
+def test_async_kitten_list_rejects_unsupported_params(kittens):
+    """Фильтры и сортировка /api/ не пропускаются молча в сокращенном списке"""
+    params = {"age__gte": 3, "ordering": "-age", "page": 1}
+    response = async_to_sync(AsyncClient().get)("/api/async/", params)
+    assert response.status_code == 400
+    assert response.json()["detail"].endswith("age__gte, ordering")
@@ -0,0 +1,135 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from kittens import cache as response_cache
+from kittens.models import Kitten
+
+User = get_user_model()
+
+# Без общего кеша пользователь читается из БД, см. test_token_without_shared_cache
+pytestmark = pytest.mark.usefixtures("shared_cache")
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    response = client.post(
+        "/api/token/", {"username": "testuser", "password": "password"}
+    )
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    return client
+
+
+def auth_user_queries(captured):
+    return [query for query in captured if "auth_user" in query["sql"]]
+
+
+@pytest.mark.django_db
+def test_token_writes_do_not_query_users(api_client, user, breed):
+    """Запись котика и оценки по токену не обращается к таблице пользователей"""
+    kitten_data = {"breed": breed.id, "color": "Серый", "age": 2, "description": "Кот"}
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.post("/api/", kitten_data)
+        assert response.status_code == status.HTTP_201_CREATED
+        kitten = Kitten.objects.get()
+        response = api_client.post(f"/api/{kitten.id}/rate/", {"rating": 5})
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["user"] == "testuser"
+        response = api_client.patch(f"/api/{kitten.id}/", {"color": "Белый"})
+        assert response.status_code == status.HTTP_200_OK
+    assert kitten.owner_id == user.id
+    assert auth_user_queries(captured) == []
+
+
+@pytest.mark.django_db
+def test_token_permissions_from_claims(api_client, user, breed):
+    """Права проверяются по claims токена"""
+    other_user = User.objects.create_user(username="other", password="password")
+    kitten = Kitten.objects.create(
+        breed=breed, color="Серый", age=2, description="Кот", owner=other_user
+    )
+
+    response = api_client.delete(f"/api/{kitten.id}/")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = api_client.post("/api/breeds/", {"name": "Британская"})
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_token_revoked_for_inactive_user(api_client, user):
+    """Токены деактивированного пользователя отзываются"""
+    response = api_client.post("/api/rate/", [], format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    user.is_active = False
+    user.save()
+
+    response = api_client.post("/api/rate/", [], format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda user: setattr(user, "is_staff", False),
+        lambda user: setattr(user, "is_superuser", True),
+        lambda user: user.set_password("new-password"),
+    ],
+    ids=["is_staff", "is_superuser", "password"],
+)
+def test_token_revoked_on_role_or_password_change(user, change):
+    """Токены с прежними правами или паролем отзываются"""
+    user.is_staff = True
+    user.save()
+    client = APIClient()
+    response = client.post(
+        "/api/token/", {"username": "testuser", "password": "password"}
+    )
+    refresh = response.data["refresh"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+    response = client.post("/api/breeds/", {"name": "Британская"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    user = User.objects.get(pk=user.pk)
+    change(user)
+    user.save()
+
+    response = client.post("/api/breeds/", {"name": "Сфинкс"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    # Токен доступа, обновленный по старому токену, тоже отозван
+    refreshed = APIClient().post("/api/token/refresh/", {"refresh": refresh})
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {refreshed.data['access']}")
+    response = client.post("/api/breeds/", {"name": "Сфинкс"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_token_kept_on_unrelated_user_change(api_client, user):
+    """Изменение полей, которых нет в токене, его не отзывает"""
+    user = User.objects.get(pk=user.pk)
+    user.first_name = "Иван"
+    user.save()
+    response = api_client.post("/api/rate/", [], format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_token_without_shared_cache(api_client, user, monkeypatch):
+    """Без общего кеша токен проверяется по пользователю из БД
+
+    Метку отзыва, поставленную другим процессом, кеш процесса не видит.
+    """
+    monkeypatch.setattr(response_cache, "is_shared", lambda: False)
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.post("/api/rate/", [], format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert auth_user_queries(captured)
+
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    response = api_client.post("/api/rate/", [], format="json")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
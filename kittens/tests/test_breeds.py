@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.test import AsyncClient
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from kittens import breeds, cache
+from kittens.models import Breed, Kitten
+
+
+@pytest.mark.django_db
+def test_registry_loads_once_per_version(breed, django_assert_num_queries):
+    """Справочник читает таблицу один раз и перечитывает после изменения породы"""
+    with django_assert_num_queries(1):
+        assert breeds.get_breed(breed.id).name == "Сиамская"
+    with django_assert_num_queries(0):
+        assert list(breeds.get_breeds()) == [breed.id]
+
+    breed.name = "Сфинкс"
+    breed.save()
+    Breed.objects.create(name="Британская")
+    with django_assert_num_queries(1):
+        names = [item.name for item in breeds.get_breeds().values()]
+    assert names == ["Британская", "Сфинкс"]
+
+
+@pytest.mark.django_db
+def test_registry_reloads_on_unknown_id(breed, django_assert_num_queries):
+    """Порода, добавленная без сигналов, находится перечитыванием по промаху"""
+    breeds.get_breeds()
+    (other,) = Breed.objects.bulk_create([Breed(name="Британская")])
+    with django_assert_num_queries(1):
+        assert breeds.get_breed(other.id).name == "Британская"
+    with django_assert_num_queries(1):
+        assert breeds.get_breed(999) is None
+
+
+@pytest.mark.django_db
+def test_registry_async_loads_once(breed, django_assert_num_queries):
+    """Одновременные асинхронные обращения загружают таблицу один раз"""
+
+    async def load():
+        return await asyncio.gather(*(breeds.aget_breeds() for _ in range(5)))
+
+    with django_assert_num_queries(1):
+        results = async_to_sync(load)()
+    assert all(result is results[0] for result in results)
+    assert list(results[0]) == [breed.id]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_registry_refreshed_after_commit(breed):
+    """Справочник, перечитанный внутри транзакции, обновляется после фиксации"""
+    with transaction.atomic():
+        breed.name = "Сфинкс"
+        breed.save()
+        # Другой процесс мог прочитать таблицу до фиксации
+        breeds.registry._state = (
+            cache.get_version(cache.BREED_CATALOG),
+            {breed.id: Breed(id=breed.id, name="Сиамская")},
+        )
+    assert breeds.get_breed(breed.id).name == "Сфинкс"
+
+
+@pytest.mark.django_db
+def test_kitten_write_validates_breed_without_queries(
+    breed, user, django_assert_num_queries
+):
+    """Порода котика проверяется и выводится по справочнику"""
+    client = APIClient()
+    client.force_authenticate(user=user)
+    breeds.get_breeds()
+    data = {"breed": breed.id, "color": "Серый", "age": 2, "description": "Кот"}
+    with django_assert_num_queries(2) as captured:
+        response = client.post("/api/", data)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert not any("kittens_breed" in query["sql"] for query in captured)
+
+    response = client.post("/api/", {**data, "breed": "abc"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "breed" in response.data
+
+    kitten = Kitten.objects.get()
+    breed.name = "Сфинкс"
+    breed.save()
+    response = client.get(f"/api/{kitten.id}/")
+    assert response.data["breed"] == {"id": breed.id, "name": "Сфинкс"}
+
+
+@pytest.mark.django_db
+def test_async_views_use_registry(breed, user):
+    """Асинхронные представления берут породы из справочника"""
+    kitten = Kitten.objects.create(
+        breed=breed, color="Серый", age=2, description="Кот", owner=user
+    )
+    client = AsyncClient()
+    response = async_to_sync(client.get)("/api/async/breeds/")
+    assert response.json()["results"] == [{"id": breed.id, "name": "Сиамская"}]
+    response = async_to_sync(client.get)("/api/async/", {"breed": breed.id})
+    assert response.json()["results"][0]["breed"]["name"] == "Сиамская"
+    response = async_to_sync(client.get)(f"/api/async/{kitten.id}/")
+    assert response.json()["breed"] == {"id": breed.id, "name": "Сиамская"}
@@ -0,0 +1,90 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+
+from kittens import cache
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def kitten(user):
+    breed = Breed.objects.create(name="Сиамская")
+    return Kitten.objects.create(
+        breed=breed, color="Серый", age=5, description="Игривый кот", owner=user
+    )
+
+
+@pytest.mark.django_db
+def test_kitten_list_cache_hit(api_client, kitten, django_assert_num_queries):
+    """Повторный запрос списка обслуживается из кеша без запросов к БД"""
+    first = api_client.get("/api/")
+    with django_assert_num_queries(0):
+        second = api_client.get("/api/")
+    assert second.status_code == status.HTTP_200_OK
+    assert second.data == first.data
+
+    with django_assert_num_queries(2):
+        api_client.get("/api/", {"page": 1})
+
+
+@pytest.mark.django_db
+def test_cache_invalidated_by_rating(api_client, user, kitten):
+    """Оценка котенка инвалидирует кеш списка и детального просмотра"""
+    assert api_client.get("/api/").data["results"][0]["average_rating"] is None
+    assert api_client.get(f"/api/{kitten.id}/").data["ratings"] == []
+
+    api_client.force_authenticate(user=user)
+    response = api_client.post(f"/api/{kitten.id}/rate/", {"rating": 4})
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert api_client.get("/api/").data["results"][0]["average_rating"] == 4.0
+    assert len(api_client.get(f"/api/{kitten.id}/").data["ratings"]) == 1
+
+
+@pytest.mark.django_db
+def test_cache_invalidated_by_breed_rename(api_client, kitten):
+    """Переименование породы инвалидирует кеш пород, списка и карточек котиков"""
+    api_client.get("/api/")
+    api_client.get("/api/breeds/")
+    api_client.get(f"/api/{kitten.id}/")
+
+    kitten.breed.name = "Британская"
+    kitten.breed.save()
+
+    assert api_client.get("/api/breeds/").data["results"][0]["name"] == "Британская"
+    assert api_client.get("/api/").data["results"][0]["breed"]["name"] == "Британская"
+    assert api_client.get(f"/api/{kitten.id}/").data["breed"]["name"] == "Британская"
+
+
+@pytest.mark.django_db
+def test_cache_stats(api_client, kitten):
+    """Счетчики попаданий и промахов доступны администратору"""
+    api_client.get("/api/")
+    api_client.get("/api/")
+    api_client.get(f"/api/{kitten.id}/")
+
+    response = api_client.get("/api/cache/stats/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    admin = User.objects.create_superuser(username="admin", password="password")
+    api_client.force_authenticate(user=admin)
+    response = api_client.get("/api/cache/stats/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["kittens"] == {"hits": 1, "misses": 1}
+    assert response.data["kitten"] == {"hits": 0, "misses": 1}
+
+
+@pytest.mark.django_db
+def test_cache_invalidated_again_after_commit(
+    api_client, user, kitten, django_capture_on_commit_callbacks
+):
+    """Ответ, закешированный до фиксации оценки, отбрасывается после нее"""
+    namespace = cache.kitten_namespace(kitten.id)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        Rating.objects.create(kitten=kitten, user=user, rating=4)
+        # Параллельный запрос видит версию после изменения, но старые строки
+        version = cache.get_version(namespace)
+    assert callbacks
+    assert cache.get_version(namespace) != version
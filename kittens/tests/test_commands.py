@@ -0,0 +1,118 @@
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def kitten():
+    user = User.objects.create_user(username="testuser", password="password")
+    breed = Breed.objects.create(name="Сиамская")
+    kitten = Kitten.objects.create(
+        breed=breed, color="Серый", age=5, description="Игривый кот", owner=user
+    )
+    Rating.objects.create(kitten=kitten, user=user, rating=3)
+    return kitten
+
+
+@pytest.mark.django_db
+def test_recompute_ratings_fixes_stale_aggregates(kitten):
+    """Проверка пересчета устаревших агрегатов рейтинга"""
+    Kitten.objects.filter(pk=kitten.pk).update(rating_count=7, average_rating=1.0)
+
+    with pytest.raises(CommandError):
+        call_command("recompute_ratings", "--check")
+
+    call_command("recompute_ratings")
+    call_command("recompute_ratings", "--check")
+    kitten.refresh_from_db()
+    assert kitten.rating_count == 1
+    assert kitten.rating_sum == 3
+    assert kitten.average_rating == 3.0
+
+
+@pytest.mark.django_db
+def test_generate_data_is_deterministic():
+    """Проверка генерации синтетических данных с фиксированным seed"""
+    call_command("generate_data", users=5, kittens=20, ratings=60, batch_size=7)
+    first = list(
+        Kitten.objects.order_by("id").values_list("color", "age", "rating_sum")
+    )
+    assert User.objects.count() == 5
+    assert len(first) == 20
+    assert Rating.objects.count() == 60
+    call_command("recompute_ratings", "--check")
+
+    Kitten.objects.all().delete()
+    User.objects.all().delete()
+    call_command("generate_data", users=5, kittens=20, ratings=60, batch_size=7)
+    second = list(
+        Kitten.objects.order_by("id").values_list("color", "age", "rating_sum")
+    )
+    assert first == second
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_endpoints_smoke(kitten):
+    """Проверка прогона бенчмарка всех эндпоинтов без изменения базы"""
+    out = io.StringIO()
+    call_command("benchmark", "endpoints", size=2, stdout=out)
+    assert "GET kitten list" in out.getvalue()
+    assert Kitten.objects.count() == 1
+    assert Breed.objects.count() == 1
+    assert not User.objects.filter(username__startswith="benchmark").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_endpoints_fails_over_query_budget(kitten, settings):
+    """Проверка ошибки бенчмарка при превышении бюджета SQL-запросов"""
+    settings.KITTENS_QUERY_BUDGETS = {
+        **settings.KITTENS_QUERY_BUDGETS,
+        "breed_stats": 0,
+    }
+    with pytest.raises(CommandError, match="GET breed stats"):
+        call_command("benchmark", "endpoints", size=2, stdout=io.StringIO())
+    assert Kitten.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_concurrent_ratings_cleans_up(kitten):
+    """Проверка параллельной записи оценок и удаления данных бенчмарка"""
+    out = io.StringIO()
+    call_command("benchmark", "concurrent_ratings", size=3, threads=2, stdout=out)
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines[1:]] == ["1", "2"]
+    assert Kitten.objects.count() == 1
+    assert Rating.objects.count() == 1
+    assert not User.objects.filter(username__startswith="benchmark").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_async_reads_smoke(kitten):
+    """Проверка сравнения синхронных и асинхронных представлений"""
+    out = io.StringIO()
+    call_command("benchmark", "async_reads", size=6, threads=2, stdout=out)
+    assert "ASGI async x2" in out.getvalue()
+    assert Kitten.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_ingestion_flushes_buffer(kitten):
+    """Проверка буферизованного приема оценок фоновым потоком"""
+    out = io.StringIO()
+    call_command("benchmark", "ingestion", size=3, threads=2, stdout=out)
+    lines = out.getvalue().splitlines()
+    assert [line.split(",")[0].split()[0] for line in lines[1:]] == [
+        "sync",
+        "buffered",
+        "buffered",
+    ]
+    assert Kitten.objects.count() == 1
+    assert Rating.objects.count() == 1
+    call_command("recompute_ratings", "--check")
@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def kitten():
+    user = User.objects.create_user(username="testuser", password="password")
+    breed = Breed.objects.create(name="Сиамская")
+    return Kitten.objects.create(
+        breed=breed, color="Серый", age=5, description="Игривый кот", owner=user
+    )
+
+
+@pytest.mark.django_db
+def test_kitten_list_not_modified(api_client, kitten, django_assert_num_queries):
+    """Список котиков с актуальным ETag возвращает 304 без запросов к БД"""
+    response = api_client.get("/api/")
+    assert response.status_code == status.HTTP_200_OK
+    etag = response["ETag"]
+    assert response.has_header("Last-Modified")
+
+    with django_assert_num_queries(0):
+        response = api_client.get("/api/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = api_client.get("/api/", {"page": 1}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_kitten_detail_etag_changes_on_rating(
+    api_client, kitten, django_assert_num_queries
+):
+    """ETag котика меняется после новой оценки"""
+    etag = api_client.get(f"/api/{kitten.id}/")["ETag"]
+
+    with django_assert_num_queries(1):
+        response = api_client.get(f"/api/{kitten.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    Rating.objects.create(kitten=kitten, user=kitten.owner, rating=5)
+    response = api_client.get(f"/api/{kitten.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_breed_list_if_modified_since(api_client, kitten):
+    """Список пород поддерживает If-Modified-Since"""
+    last_modified = api_client.get("/api/breeds/")["Last-Modified"]
+
+    response = api_client.get("/api/breeds/", HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def expire_local_cache(monkeypatch, settings):
+    """Сдвигает часы локального кеша за срок жизни версий"""
+    now = time.time() + settings.KITTENS_CACHE_TIMEOUT + 1
+    clock = SimpleNamespace(time=lambda: now)
+    monkeypatch.setattr("django.core.cache.backends.base.time", clock)
+    monkeypatch.setattr("django.core.cache.backends.locmem.time", clock)
+
+
+@pytest.mark.django_db
+def test_local_cache_etag_expires(api_client, kitten, monkeypatch, settings):
+    """С локальным кешем процесса ETag списка живет не дольше таймаута кеша"""
+    etag = api_client.get("/api/")["ETag"]
+
+    expire_local_cache(monkeypatch, settings)
+    response = api_client.get("/api/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("shared_cache")
+def test_shared_cache_etag_kept(api_client, kitten, monkeypatch, settings):
+    """С общим кешем версия ETag хранится до изменения данных"""
+    etag = api_client.get("/api/")["ETag"]
+
+    expire_local_cache(monkeypatch, settings)
+    response = api_client.get("/api/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,110 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kittens import cache
+from kittens.middleware import ReplicaPinningMiddleware
+from kittens.models import Kitten
+from kittens.routers import PrimaryReplicaRouter, use_primary
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+def test_sqlite_connection_pragmas(settings):
+    """Проверка настройки нового соединения SQLite"""
+    connection.close()
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone() == (1,)  # NORMAL
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone() == (settings.KITTENS_SQLITE_PRAGMAS["busy_timeout"],)
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.KITTENS_REPLICA_DATABASES = ["replica1", "replica2"]
+    return settings.KITTENS_REPLICA_DATABASES
+
+
+def routed_reads(request):
+    """Вызывает middleware и возвращает базу, выбранную для чтения во view"""
+    reads = []
+
+    def view(request):
+        reads.append(PrimaryReplicaRouter().db_for_read(Kitten))
+        return HttpResponse(status=201 if request.method == "POST" else 200)
+
+    response = ReplicaPinningMiddleware(view)(request)
+    return reads[0], response
+
+
+def test_router_reads_from_replicas(replicas):
+    """Чтение идет на реплики, запись на основную базу"""
+    router = PrimaryReplicaRouter()
+    assert {router.db_for_read(Kitten) for _ in range(50)} == set(replicas)
+    assert router.db_for_write(Kitten) == "default"
+    with use_primary():
+        assert router.db_for_read(Kitten) == "default"
+
+
+def test_router_without_replicas():
+    """Без реплик все запросы идут в основную базу"""
+    assert PrimaryReplicaRouter().db_for_read(Kitten) == "default"
+
+
+@pytest.mark.django_db
+def test_router_reads_from_primary_in_transaction(replicas):
+    """Внутри транзакции чтение идет в основную базу"""
+    assert PrimaryReplicaRouter().db_for_read(Kitten) == "default"
+
+
+def test_write_pins_reads_to_primary(replicas):
+    """После записи пользователь с JWT читает с основной базы без cookie"""
+    factory = RequestFactory()
+
+    def bearer(user_id):
+        return {
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(User(id=user_id))}"
+        }
+
+    db, response = routed_reads(factory.get("/api/", **bearer(7)))
+    assert db in replicas
+
+    db, response = routed_reads(factory.post("/api/", **bearer(7)))
+    assert db == "default"
+    assert not response.cookies
+
+    db, _ = routed_reads(factory.get("/api/", **bearer(7)))
+    assert db == "default"
+    db, _ = routed_reads(factory.get("/api/", **bearer(8)))
+    assert db in replicas
+
+
+class CachedView(cache.CachedResponseMixin):
+    cache_namespace = "kittens"
+
+
+def test_replica_reads_not_cached_after_write(replicas):
+    """Ответ с реплики в окне после записи не попадает в кеш"""
+    request = Request(RequestFactory().get("/api/"))
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return Response({"count": len(calls)})
+
+    cache.bump_version("kittens")
+    CachedView().cached_response(handler, request)
+    CachedView().cached_response(handler, request)
+    assert len(calls) == 2
+
+    with use_primary():
+        CachedView().cached_response(handler, request)
+        CachedView().cached_response(handler, request)
+    assert len(calls) == 3
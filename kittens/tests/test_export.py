@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+from rest_framework import status
+
+from kittens.models import Breed, Kitten, Rating
+
+
+@pytest.fixture
+def breeds():
+    return [Breed.objects.create(name=name) for name in ("Сиамская", "Британская")]
+
+
+@pytest.fixture
+def kittens(user, breeds):
+    kittens = [
+        Kitten.objects.create(
+            breed=breed, color="Серый", age=3, description="Игривый кот", owner=user
+        )
+        for breed in breeds
+    ]
+    Rating.objects.create(kitten=kittens[0], user=user, rating=4)
+    return kittens
+
+
+@pytest.mark.django_db
+def test_kitten_export_ndjson(api_client, kittens, breeds):
+    """Проверка выгрузки котиков в NDJSON с фильтром по породе"""
+    response = api_client.get("/api/export/", {"format": "ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+    rows = [
+        json.loads(line) for line in b"".join(response.streaming_content).splitlines()
+    ]
+    assert rows == [
+        {
+            "id": kittens[0].id,
+            "breed": "Сиамская",
+            "color": "Серый",
+            "age": 3,
+            "description": "Игривый кот",
+            "owner": "testuser",
+            "average_rating": 4.0,
+        },
+        {
+            "id": kittens[1].id,
+            "breed": "Британская",
+            "color": "Серый",
+            "age": 3,
+            "description": "Игривый кот",
+            "owner": "testuser",
+            "average_rating": None,
+        },
+    ]
+
+    response = api_client.get(
+        "/api/export/", {"format": "ndjson", "breed": breeds[1].id}
+    )
+    assert len(b"".join(response.streaming_content).splitlines()) == 1
+
+
+@pytest.mark.django_db
+def test_kitten_export_csv(api_client, kittens):
+    """Проверка выгрузки котиков в CSV"""
+    response = api_client.get("/api/export/", {"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    content = b"".join(response.streaming_content).decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert len(rows) == 2
+    assert rows[0]["breed"] == "Сиамская"
+    assert rows[0]["average_rating"] == "4.0"
+    assert rows[1]["average_rating"] == ""
+
+
+@pytest.mark.django_db
+def test_kitten_export_bounded_memory(api_client, user, breeds, settings):
+    """Выгрузка большого каталога не держит его целиком в памяти"""
+    settings.KITTENS_EXPORT_CHUNK_SIZE = 100
+    Kitten.objects.bulk_create(
+        (
+            Kitten(
+                breed=breeds[i % 2],
+                color="Серый",
+                age=1 + i % 24,
+                description="Котёнок " * 100,
+                owner=user,
+            )
+            for i in range(5000)
+        ),
+        batch_size=500,
+    )
+
+    response = api_client.get("/api/export/", {"format": "ndjson"})
+    total = 0
+    tracemalloc.start()
+    try:
+        for chunk in response.streaming_content:
+            total += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert total > 5_000_000
+    assert peak < total / 4
@@ -0,0 +1,152 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework import status
+
+from kittens.filters import KittenFilter
+from kittens.models import Breed, Kitten
+from kittens.views import KittenListCreateView
+
+User = get_user_model()
+
+
+@pytest.fixture
+def breeds():
+    return [
+        Breed.objects.create(name=name) for name in ("Сиамская", "Британская", "Сфинкс")
+    ]
+
+
+@pytest.fixture
+def kittens(breeds):
+    user = User.objects.create_user(username="testuser", password="password")
+    return Kitten.objects.bulk_create(
+        Kitten(
+            breed=breeds[i % 3],
+            color=("Серый", "Белый", "Рыжий", "Черный")[i % 4],
+            age=1 + i,
+            description="Котенок",
+            owner=user,
+            average_rating=i % 6,
+        )
+        for i in range(12)
+    )
+
+
+def list_ids(api_client, params):
+    """id котиков со всех страниц списка"""
+    ids, url = [], "/api/"
+    while url:
+        response = api_client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        ids += [kitten["id"] for kitten in response.data["results"]]
+        url, params = response.data["next"], None
+    return ids
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params, expected",
+    [
+        ({"age__gte": 4, "age__lte": 6}, lambda k: 4 <= k.age <= 6),
+        ({"age__lte": 3}, lambda k: k.age <= 3),
+        ({"color__in": "Серый,Рыжий"}, lambda k: k.color in ("Серый", "Рыжий")),
+        ({"min_rating": 4}, lambda k: k.average_rating >= 4),
+        (
+            {"color__in": "Белый", "age__gte": 5},
+            lambda k: k.color == "Белый" and k.age >= 5,
+        ),
+    ],
+)
+def test_kitten_list_filters(api_client, kittens, params, expected):
+    """Проверка фильтров списка котиков"""
+    assert list_ids(api_client, params) == [k.id for k in kittens if expected(k)]
+
+
+@pytest.mark.django_db
+def test_kitten_list_breed_filters(api_client, kittens, breeds):
+    """Проверка фильтров по одной и нескольким породам"""
+    first, second, _ = breeds
+    assert list_ids(api_client, {"breed": first.id}) == [
+        k.id for k in kittens if k.breed_id == first.id
+    ]
+    assert list_ids(api_client, {"breed__in": f"{first.id},{second.id}"}) == [
+        k.id for k in kittens if k.breed_id in (first.id, second.id)
+    ]
+
+
+@pytest.mark.django_db
+def test_kitten_list_ordering(api_client, kittens):
+    """Проверка сортировки списка с id для одинаковых значений"""
+    expected = sorted(kittens, key=lambda k: (-k.average_rating, k.id))
+    assert list_ids(api_client, {"ordering": "-average_rating"}) == [
+        k.id for k in expected
+    ]
+    assert list_ids(api_client, {"ordering": "-age"}) == [k.id for k in kittens][::-1]
+
+
+@pytest.mark.django_db
+def test_kitten_list_invalid_filters(api_client, kittens):
+    """Проверка ошибки для некорректных значений фильтров"""
+    response = api_client.get("/api/", {"age__gte": "много", "ordering": "owner"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {"age__gte", "ordering"}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"age__gte": 10**30},
+        {"age__lte": -1},
+        {"min_rating": 6},
+        {"breed__in": f"1,{10**30}"},
+    ],
+)
+def test_kitten_list_out_of_range_filters(api_client, kittens, params):
+    """Проверка ошибки для чисел вне допустимых значений поля"""
+    response = api_client.get("/api/", params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == set(params)
+
+
+@pytest.mark.django_db
+def test_kitten_export_filters(api_client, kittens):
+    """Проверка фильтров при выгрузке котиков"""
+    response = api_client.get("/api/export/", {"format": "csv", "age__gte": 11})
+    assert response.status_code == status.HTTP_200_OK
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert len(lines) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"age__gte": 2},
+        {"age__lte": 5},
+        {"age__gte": 2, "age__lte": 6},
+        {"color__in": "Серый,Белый"},
+        {"breed__in": "{breed},{other_breed}"},
+        {"breed": "{breed}"},
+        {"breed": "{breed}", "age__gte": 3},
+        {"breed": "{breed}", "ordering": "age"},
+        {"breed": "{breed}", "ordering": "-average_rating"},
+        {"min_rating": 4},
+        {"min_rating": 4, "ordering": "-average_rating"},
+        {"color__in": "Серый", "ordering": "age"},
+    ],
+)
+def test_kitten_filters_use_index(kittens, breeds, params):
+    """Каждое сочетание фильтров читает котиков по индексу, а не всю таблицу"""
+    params = {
+        name: str(value).format(breed=breeds[0].id, other_breed=breeds[1].id)
+        for name, value in params.items()
+    }
+    filterset = KittenFilter(params, queryset=KittenListCreateView.queryset)
+    assert filterset.is_valid(), filterset.errors
+    plan = filterset.qs.explain()
+    kitten_steps = [line for line in plan.splitlines() if " kittens_kitten" in line]
+    assert kitten_steps, plan
+    for step in kitten_steps:
+        assert "USING INDEX" in step or "USING INTEGER PRIMARY KEY" in step, plan
+        assert "SCAN" not in step, plan
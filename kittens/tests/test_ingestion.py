@@ -0,0 +1,151 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from kittens import ingestion
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def users():
+    return [User.objects.create_user(username=f"judge{i}") for i in range(3)]
+
+
+@pytest.fixture
+def kittens(users):
+    breed = Breed.objects.create(name="Сиамская")
+    return [
+        Kitten.objects.create(
+            breed=breed, color="Серый", age=2, description="Котенок", owner=users[0]
+        )
+        for _ in range(2)
+    ]
+
+
+@pytest.fixture
+def buffer(tmp_path, settings, monkeypatch):
+    """Буфер без фонового потока: очередь пишется в базу вызовом flush()"""
+    settings.KITTENS_RATING_INGESTION = True
+    buffer = ingestion.RatingBuffer(
+        tmp_path / "ratings-1.log", batch_size=2, flush_interval=60, max_pending=5
+    )
+    buffer.open()
+    monkeypatch.setattr(ingestion, "_buffer", buffer)
+    yield buffer
+    buffer._log.close()
+
+
+def rate(user, kitten, rating):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client.post(f"/api/{kitten.id}/rate/", {"rating": rating})
+
+
+@pytest.mark.django_db
+def test_buffered_rating_is_accepted_and_flushed(buffer, users, kittens):
+    """Оценка подтверждается ответом 202 и попадает в базу пачкой"""
+    response = rate(users[1], kittens[0], 5)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.data == {"user": "judge1", "rating": 5}
+    rate(users[2], kittens[0], 3)
+    rate(users[1], kittens[1], 4)
+    assert not Rating.objects.exists()
+    assert buffer.path.read_bytes().count(b"\n") == 3
+
+    # Повторная оценка заменяет предыдущую
+    rate(users[1], kittens[0], 1)
+    assert buffer.flush() == 4
+    assert len(buffer) == 0
+    kittens[0].refresh_from_db()
+    assert kittens[0].rating_histogram == (1, 0, 1, 0, 0)
+    # Журнал полностью записан в базу и начинается заново
+    assert buffer.path.read_bytes() == b""
+    call_command("recompute_ratings", "--check")
+
+
+@pytest.mark.django_db
+def test_buffered_rating_validation(buffer, users, kittens):
+    """Неверная оценка и несуществующий котик отклоняются до записи в журнал"""
+    assert rate(users[1], kittens[0], 7).status_code == status.HTTP_400_BAD_REQUEST
+    kittens[1].delete()
+    assert rate(users[1], kittens[1], 5).status_code == status.HTTP_404_NOT_FOUND
+    assert len(buffer) == 0
+    assert buffer.path.read_bytes() == b""
+
+
+@pytest.mark.django_db
+def test_buffer_full(buffer, users, kittens):
+    """Переполненная очередь отвечает 503 вместо потери оценок"""
+    buffer.max_pending = 1
+    assert rate(users[1], kittens[0], 5).status_code == status.HTTP_202_ACCEPTED
+    response = rate(users[2], kittens[0], 5)
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert len(buffer) == 1
+
+
+@pytest.mark.django_db
+def test_flush_skips_deleted_kittens(buffer, users, kittens):
+    """Оценки котиков, удаленных до записи пачки, отбрасываются"""
+    rate(users[1], kittens[0], 5)
+    rate(users[1], kittens[1], 4)
+    kittens[0].delete()
+    assert buffer.flush() == 2
+    assert list(Rating.objects.values_list("kitten_id", "rating")) == [
+        (kittens[1].id, 4)
+    ]
+
+
+@pytest.mark.django_db
+def test_replay_after_crash(buffer, users, kittens, tmp_path):
+    """Оценки после контрольной точки повторяются из журнала упавшего процесса"""
+    rate(users[1], kittens[0], 5)
+    rate(users[2], kittens[0], 4)
+    rate(users[1], kittens[1], 2)
+    buffer._log.write(b"1 2")
+    # Первая оценка записана в базу до падения и затем изменена
+    ingestion.write_ratings([(kittens[0].id, users[1].id, 1)])
+    ingestion.write_checkpoint(buffer.path, buffer._pending[0][3])
+    # Процесс упал: очередь в памяти и блокировка журнала потеряны,
+    # журнал и контрольная точка остались
+    buffer._log.close()
+    log = tmp_path / "ratings-2.log"
+    buffer.path.rename(log)
+    ingestion.checkpoint_path(buffer.path).rename(ingestion.checkpoint_path(log))
+
+    call_command("replay_ratings", log_dir=tmp_path)
+
+    assert sorted(Rating.objects.values_list("kitten_id", "user_id", "rating")) == [
+        (kittens[0].id, users[1].id, 1),
+        (kittens[0].id, users[2].id, 4),
+        (kittens[1].id, users[1].id, 2),
+    ]
+    assert not list(tmp_path.iterdir())
+    call_command("recompute_ratings", "--check")
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(ingestion.fcntl is None, reason="flock есть только в POSIX")
+def test_replay_skips_running_process_log(buffer, users, kittens, tmp_path):
+    """Журнал работающего процесса не повторяется и не удаляется"""
+    log = tmp_path / "ratings-2.log"
+    running = ingestion.RatingBuffer(
+        log, batch_size=2, flush_interval=60, max_pending=5
+    )
+    running.open()
+    running.add(kittens[0].id, users[1].id, 5)
+
+    call_command("replay_ratings", log_dir=tmp_path)
+    assert not Rating.objects.exists()
+    assert log.read_bytes() == b"%d %d 5\n" % (kittens[0].id, users[1].id)
+
+    # Процесс остановился, не успев записать очередь в базу
+    running._log.close()
+    call_command("replay_ratings", log_dir=tmp_path)
+    assert list(Rating.objects.values_list("kitten_id", "rating")) == [
+        (kittens[0].id, 5)
+    ]
+    assert not log.exists()
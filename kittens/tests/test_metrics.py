@@ -0,0 +1,122 @@
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient
+from rest_framework import status
+
+from kittens import breeds, metrics
+from kittens.models import Breed, Kitten
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+@pytest.fixture
+def kittens():
+    user = User.objects.create_user(username="testuser", password="password")
+    breed = Breed.objects.create(name="Сиамская")
+    kittens = [
+        Kitten.objects.create(
+            breed=breed, color="Серый", age=2, description="Котенок", owner=user
+        )
+        for _ in range(3)
+    ]
+    # Справочник пород загружен заранее, как в работающем процессе
+    breeds.get_breeds()
+    return kittens
+
+
+def server_timing(response):
+    """Метрики заголовка Server-Timing по именам"""
+    entries = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+@pytest.mark.django_db
+def test_server_timing_header(api_client, kittens):
+    """Проверка заголовка Server-Timing со временем и числом SQL-запросов"""
+    response = api_client.get("/api/")
+    assert response.status_code == status.HTTP_200_OK
+
+    timing = server_timing(response)
+    assert set(timing) == {"app", "db", "render"}
+    assert timing["db"]["desc"] == '"2 queries"'
+    assert float(timing["app"]["dur"]) >= float(timing["db"]["dur"])
+
+
+@pytest.mark.django_db
+def test_metrics_are_recorded_per_view(api_client, kittens):
+    """Проверка гистограмм по представлениям"""
+    api_client.get("/api/")
+    api_client.get(f"/api/{kittens[0].id}/")
+    api_client.get("/api/missing/")
+
+    labels = {"view": "kitten_list_create", "method": "GET"}
+    assert metrics.REQUEST_SECONDS.get_count(**labels) == 1
+    assert metrics.QUERIES.get_count(**labels) == 1
+    assert metrics.RENDER_SECONDS.get_count(**labels) == 1
+    assert metrics.RESPONSE_BYTES.get_count(**labels) == 1
+    assert metrics.REQUEST_SECONDS.get_count(
+        view="kitten_detail_update_delete", method="GET"
+    )
+    assert metrics.REQUEST_SECONDS.get_count(view="unmatched", method="GET") == 1
+
+
+@pytest.mark.django_db
+def test_async_view_queries_are_counted(kittens):
+    """Проверка подсчета запросов асинхронного ORM в потоках"""
+    response = async_to_sync(AsyncClient().get)(f"/api/async/{kittens[0].id}/")
+    assert response.status_code == status.HTTP_200_OK
+    assert server_timing(response)["db"]["desc"] == '"2 queries"'
+
+
+@pytest.mark.django_db
+def test_query_budget_exceeded(api_client, kittens, settings, caplog):
+    """Проверка предупреждения о превышении бюджета SQL-запросов"""
+    settings.KITTENS_QUERY_BUDGETS = {"kitten_list_create": 1}
+    with caplog.at_level(logging.WARNING, logger="kittens.middleware"):
+        api_client.get("/api/")
+        api_client.get("/api/breeds/")
+
+    assert metrics.BUDGET_EXCEEDED.get_count(view="kitten_list_create", method="GET")
+    assert not metrics.BUDGET_EXCEEDED.get_count(view="breed_list_create", method="GET")
+    assert "GET /api/: 2 SQL queries, budget is 1" in caplog.text
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(api_client, kittens):
+    """Проверка вывода метрик в формате Prometheus"""
+    api_client.get("/api/")
+    response = api_client.get("/api/metrics/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "text/plain; charset=utf-8"
+
+    body = response.content.decode()
+    assert "# TYPE kittens_request_duration_seconds histogram" in body
+    labels = 'method="GET",view="kitten_list_create"'
+    assert f'kittens_request_queries_bucket{{{labels},le="1"}} 0' in body
+    assert f'kittens_request_queries_bucket{{{labels},le="2"}} 1' in body
+    assert f'kittens_request_queries_bucket{{{labels},le="+Inf"}} 1' in body
+    assert f"kittens_request_queries_sum{{{labels}}} 2" in body
+    assert f"kittens_request_queries_count{{{labels}}} 1" in body
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_token(api_client, settings):
+    """Проверка доступа к метрикам по токену"""
+    settings.KITTENS_METRICS_TOKEN = "secret"
+    assert api_client.get("/api/metrics/").status_code == status.HTTP_403_FORBIDDEN
+
+    api_client.credentials(HTTP_AUTHORIZATION="Bearer secret")
+    assert api_client.get("/api/metrics/").status_code == status.HTTP_200_OK
@@ -0,0 +1,195 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from kittens import breeds
+from kittens.models import Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def kittens():
+    users = [
+        User.objects.create_user(username=f"user{i}", password="password")
+        for i in range(3)
+    ]
+    breed_list = [
+        Breed.objects.create(name=name) for name in ("Сиамская", "Британская")
+    ]
+    kittens = [
+        Kitten.objects.create(
+            breed=breed_list[i % 2],
+            color="Серый",
+            age=i + 1,
+            description="Игривый кот",
+            owner=users[i % 3],
+        )
+        for i in range(4)
+    ]
+    for kitten in kittens:
+        for user in users:
+            Rating.objects.create(kitten=kitten, user=user, rating=3)
+    # Справочник пород загружен заранее, как в работающем процессе
+    breeds.get_breeds()
+    return kittens
+
+
+@pytest.mark.django_db
+def test_kitten_list_queries(api_client, kittens, django_assert_num_queries):
+    """Список котиков: COUNT для пагинации и один SELECT без таблицы пород"""
+    with django_assert_num_queries(2) as captured:
+        response = api_client.get("/api/", {"breed": kittens[0].breed_id})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 2
+    assert response.data["results"][0]["breed"]["name"] == "Сиамская"
+    assert not any("kittens_breed" in query["sql"] for query in captured)
+
+
+@pytest.mark.django_db
+def test_kitten_list_does_not_load_ratings(
+    api_client, kittens, django_assert_num_queries
+):
+    """Список котиков не подгружает таблицу рейтингов"""
+    with django_assert_num_queries(2) as captured:
+        api_client.get("/api/")
+    assert not any("kittens_rating" in query["sql"] for query in captured)
+
+
+@pytest.mark.django_db
+def test_kitten_detail_queries(api_client, kittens, django_assert_num_queries):
+    """Детальный просмотр: версия для ETag, котик и рейтинги без N+1"""
+    with django_assert_num_queries(3):
+        response = api_client.get(f"/api/{kittens[0].id}/")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["ratings"]) == 3
+    assert response.data["ratings"][0]["user"].startswith("user")
+
+
+@pytest.mark.django_db
+def test_breed_list_queries(api_client, kittens, django_assert_num_queries):
+    """Список пород отдается из справочника процесса без запросов"""
+    with django_assert_num_queries(0):
+        response = api_client.get("/api/breeds/")
+    assert response.status_code == status.HTTP_200_OK
+    assert [breed["name"] for breed in response.data["results"]] == [
+        "Британская",
+        "Сиамская",
+    ]
+
+
+@pytest.mark.django_db
+def test_kitten_list_cursor_queries(api_client, kittens, django_assert_num_queries):
+    """Курсорная пагинация обходится одним SELECT без COUNT"""
+    with django_assert_num_queries(1):
+        response = api_client.get("/api/", {"pagination": "cursor"})
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_kitten_leaderboard_queries(api_client, kittens, django_assert_num_queries):
+    """Рейтинг лучших котиков читается одним SELECT по индексу"""
+    with django_assert_num_queries(1):
+        response = api_client.get("/api/top/", {"breed": kittens[0].breed_id})
+    assert response.status_code == status.HTTP_200_OK
+
+    plan = (
+        Kitten.objects.filter(rating_count__gt=0, breed_id=kittens[0].breed_id)
+        .order_by("-average_rating", "id")[:10]
+        .explain()
+    )
+    assert "kittens_kit_breed_i_77b27c_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def kitten_selects(captured):
+    return [query for query in captured if query["sql"].startswith("SELECT")]
+
+
+@pytest.mark.django_db
+def test_kitten_patch_queries(api_client, kittens, django_assert_num_queries):
+    """Частичное изменение котика: SELECT без JOIN, UPDATE и индекс поиска"""
+    api_client.force_authenticate(user=kittens[0].owner)
+    with django_assert_num_queries(3) as captured:
+        response = api_client.patch(f"/api/{kittens[0].id}/", {"color": "Белый"})
+    assert response.status_code == status.HTTP_200_OK
+    select = kitten_selects(captured)[0]["sql"]
+    assert "JOIN" not in select
+    assert "kittens_rating" not in select
+
+
+@pytest.mark.django_db
+def test_kitten_put_queries(api_client, kittens, django_assert_num_queries):
+    """Полное изменение котика: SELECT, UPDATE и индекс поиска
+
+    Порода проверяется по справочнику процесса без запроса к БД.
+    """
+    api_client.force_authenticate(user=kittens[0].owner)
+    kitten_data = {
+        "breed": kittens[0].breed_id,
+        "color": "Белый",
+        "age": 6,
+        "description": "Кот",
+    }
+    with django_assert_num_queries(3) as captured:
+        response = api_client.put(f"/api/{kittens[0].id}/", kitten_data)
+    assert response.status_code == status.HTTP_200_OK
+    assert not any("JOIN" in query["sql"] for query in captured)
+
+
+@pytest.mark.django_db
+def test_kitten_delete_queries(api_client, kittens):
+    """Удаление котика: SELECT без JOIN и чтение гистограммы в транзакции"""
+    api_client.force_authenticate(user=kittens[0].owner)
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.delete(f"/api/{kittens[0].id}/")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    selects = [
+        query["sql"]
+        for query in kitten_selects(captured)
+        if 'FROM "kittens_kitten"' in query["sql"]
+    ]
+    assert len(selects) == 2
+    assert not any("JOIN" in select for select in selects)
+    assert "stars_1" not in selects[0]
+
+
+@pytest.mark.django_db
+def test_kitten_write_forbidden_queries(api_client, kittens, django_assert_num_queries):
+    """Запрет записи чужого котика определяется по owner_id одним SELECT"""
+    api_client.force_authenticate(user=kittens[1].owner)
+    with django_assert_num_queries(1):
+        response = api_client.delete(f"/api/{kittens[0].id}/")
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_kitten_update_does_not_load_rating_counters(api_client, kittens):
+    """Изменение котика не читает и не пишет счетчики оценок"""
+    api_client.force_authenticate(user=kittens[0].owner)
+    with CaptureQueriesContext(connection) as captured:
+        response = api_client.patch(f"/api/{kittens[0].id}/", {"color": "Белый"})
+    assert response.status_code == status.HTTP_200_OK
+    assert not any(
+        "rating_count" in query["sql"] or "stars_1" in query["sql"]
+        for query in captured
+        if "kittens_kitten" in query["sql"]
+    )
+
+
+@pytest.mark.django_db
+def test_rating_create_queries(api_client, kittens, settings):
+    """Оценка и повторная оценка котика укладываются в бюджет запросов"""
+    user = User.objects.create_user(username="rater")
+    api_client.force_authenticate(user=user)
+    budget = settings.KITTENS_QUERY_BUDGETS["kitten_rate"]
+    for rating in (3, 5):
+        with CaptureQueriesContext(connection) as captured:
+            response = api_client.post(
+                f"/api/{kittens[0].id}/rate/", {"rating": rating}
+            )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert len(captured) <= budget
+    assert Rating.objects.get(kitten=kittens[0], user=user).rating == 5
@@ -0,0 +1,52 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from kittens import renderers
+from kittens.renderers import FastJSONParser, FastJSONRenderer
+
+DATA = {
+    "id": 1,
+    "breed": {"id": 2, "name": "Мейн-кун"},
+    "description": "Очень игривый котёнок\u2028",
+    "average_rating": 4.5,
+    "price": Decimal("10.50"),
+    "created": datetime(2024, 9, 30, 5, 14, 1, 123456, tzinfo=timezone.utc),
+    "ratings": [{"user": "user1", "rating": 5}, None],
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_json_renderer_matches_drf(monkeypatch, use_orjson):
+    """Быстрый рендерер выдает те же байты, что и JSONRenderer"""
+    if not use_orjson:
+        monkeypatch.setattr(renderers, "orjson", None)
+    content = FastJSONRenderer().render(DATA)
+    assert content == JSONRenderer().render(DATA)
+    assert "Мейн-кун".encode() in content
+
+
+def test_fast_json_renderer_indent():
+    """С отступами рендерер совпадает с JSONRenderer"""
+    media_type = "application/json; indent=4"
+    assert FastJSONRenderer().render(DATA, media_type) == (
+        JSONRenderer().render(DATA, media_type)
+    )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_json_parser(monkeypatch, use_orjson):
+    """Быстрый парсер разбирает JSON как JSONParser и сообщает об ошибках"""
+    if not use_orjson:
+        monkeypatch.setattr(renderers, "orjson", None)
+    content = '[{"breed": 1, "color": "Серый"}]'.encode()
+    assert FastJSONParser().parse(io.BytesIO(content)) == (
+        JSONParser().parse(io.BytesIO(content))
+    )
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(io.BytesIO(b'{"breed": NaN}'))
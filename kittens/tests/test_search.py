@@ -0,0 +1,90 @@
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from kittens import search
+from kittens.models import Kitten
+
+
+@pytest.fixture
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.fixture
+def kittens(user, breed):
+    return [
+        Kitten.objects.create(
+            breed=breed, color=color, age=3, description=description, owner=user
+        )
+        for color, description in (
+            ("Рыжий", "Пушистый и игривый котёнок"),
+            ("Серый", "Спокойная кошечка, любит игры"),
+            ("Черный", "Игривая, игривая и очень ласковая"),
+        )
+    ]
+
+
+def search_ids(api_client, text):
+    response = api_client.get("/api/", {"search": text})
+    assert response.status_code == status.HTTP_200_OK
+    return [kitten["id"] for kitten in response.data["results"]]
+
+
+@pytest.mark.parametrize(
+    "words",
+    [
+        ("игривый", "игривая", "игривого", "игривые"),
+        ("пушистый", "пушистая", "пушистость"),
+        ("рыжий", "рыжая", "Рыжие"),
+    ],
+)
+def test_stem_word_forms(words):
+    """Проверка приведения словоформ к одной основе"""
+    assert len({search.stem(word) for word in words}) == 1
+
+
+@pytest.mark.django_db
+def test_search_word_forms_and_relevance(api_client, kittens):
+    """Проверка поиска по словоформам с сортировкой по релевантности"""
+    ginger, grey, black = kittens
+    # Котенок с двумя упоминаниями слова релевантнее
+    assert search_ids(api_client, "игривые") == [black.id, ginger.id]
+    assert search_ids(api_client, "рыжая пушистая") == [ginger.id]
+    assert search_ids(api_client, "спокойные") == [grey.id]
+    assert search_ids(api_client, "лысый") == []
+
+
+@pytest.mark.django_db
+def test_search_follows_updates_and_deletes(api_client, kittens):
+    """Проверка обновления индекса при изменении и удалении котика"""
+    ginger, grey, _ = kittens
+    grey.description = "Очень пушистая"
+    grey.save()
+    ginger.delete()
+
+    assert search_ids(api_client, "пушистый") == [grey.id]
+
+
+@pytest.mark.django_db
+def test_search_indexes_bulk_created_kittens(api_client, breed):
+    """Проверка индексации котиков, созданных пакетом"""
+    response = api_client.post(
+        "/api/bulk/",
+        [
+            {"breed": breed.id, "color": "Белый", "age": 2, "description": "Ласковый"},
+            {"breed": breed.id, "color": "Белый", "age": 4, "description": "Соня"},
+        ],
+        format="json",
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    assert search_ids(api_client, "ласковая белая") == [response.data[0]["id"]]
+
+
+@pytest.mark.django_db
+def test_search_ignores_query_syntax(api_client, kittens):
+    """Проверка, что спецсимволы запроса не ломают поиск"""
+    assert search_ids(api_client, '"пушистый" (рыжий*') == [kittens[0].id]
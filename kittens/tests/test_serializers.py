@@ -1,19 +1,17 @@
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 
-from kittens.models import Breed, Kitten
+from kittens.models import Kitten, Rating
 from kittens.serializers import (KittenCreateUpdateSerializer,
+                                 KittenDetailRowSerializer,
+                                 KittenDetailSerializer, KittenRowSerializer,
                                  KittenSerializer, RatingSerializer)
 
 User = get_user_model()
 
 
-@pytest.fixture
-def breed():
-    return Breed.objects.create(name="Сиамская")
-
-
 @pytest.fixture
 def regular_user():
     return User.objects.create_user(username="testuser", password="testpassword")
@@ -106,3 +104,48 @@ def test_invalid_rating(regular_user):
         serializer.is_valid(raise_exception=True)
 
     assert "rating" in exc_info.value.detail
+
+
+@pytest.mark.django_db
+def test_kitten_row_serializers_match_model_serializers(kitten, regular_user):
+    """Быстрые сериализаторы дают тот же JSON, что и модельные"""
+    other_kitten = Kitten.objects.create(
+        breed=kitten.breed,
+        color="Белый",
+        age=2,
+        description="Спокойный котёнок",
+        owner=regular_user,
+    )
+    Rating.objects.create(kitten=kitten, user=regular_user, rating=4)
+    renderer = JSONRenderer()
+
+    kittens = Kitten.objects.select_related("breed", "owner").order_by("id")
+    rows = Kitten.objects.order_by("id").values(*KittenRowSerializer.fields)
+    assert renderer.render(KittenRowSerializer(rows, many=True).data) == (
+        renderer.render(KittenSerializer(kittens, many=True).data)
+    )
+
+    for obj in (kitten, other_kitten):
+        obj = Kitten.objects.prefetch_related("rating_kitten__user").get(pk=obj.pk)
+        row = Kitten.objects.values(*KittenDetailRowSerializer.fields).get(pk=obj.pk)
+        assert renderer.render(KittenDetailRowSerializer(row).data) == (
+            renderer.render(KittenDetailSerializer(obj).data)
+        )
+
+
+@pytest.mark.django_db
+def test_kitten_update_keeps_concurrent_ratings(kitten, regular_user):
+    """Изменение котика не затирает оценку, добавленную после его загрузки"""
+    loaded = Kitten.objects.get(pk=kitten.pk)
+    Rating.objects.create(kitten=kitten, user=regular_user, rating=4)
+
+    serializer = KittenCreateUpdateSerializer(
+        loaded, data={"color": "Белый"}, partial=True
+    )
+    assert serializer.is_valid(), serializer.errors
+    serializer.save()
+
+    kitten.refresh_from_db()
+    assert kitten.color == "Белый"
+    assert (kitten.rating_count, kitten.rating_sum, kitten.stars_4) == (1, 4, 1)
+    assert kitten.average_rating == 4
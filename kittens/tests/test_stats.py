@@ -0,0 +1,197 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from kittens import stats
+from kittens.models import STAR_FIELDS, Breed, Kitten, Rating
+
+User = get_user_model()
+
+
+@pytest.fixture
+def users():
+    return [User.objects.create_user(username=f"judge{i}") for i in range(4)]
+
+
+@pytest.fixture
+def breeds():
+    return [Breed.objects.create(name=name) for name in ("Сиамская", "Сфинкс")]
+
+
+@pytest.fixture
+def kittens(users, breeds):
+    return [
+        Kitten.objects.create(
+            breed=breeds[i % 2],
+            color="Серый",
+            age=2,
+            description="Котенок",
+            owner=users[0],
+        )
+        for i in range(3)
+    ]
+
+
+def rate(user, kitten, rating):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    response = client.post(f"/api/{kitten.id}/rate/", {"rating": rating})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def histograms(model):
+    rows = model.objects.values_list("id", *STAR_FIELDS).order_by("id")
+    return {row[0]: row[1:] for row in rows}
+
+
+def assert_consistent():
+    call_command("recompute_ratings", "--check")
+
+
+@pytest.mark.django_db
+def test_rating_updates_kitten_and_breed_histograms(users, breeds, kittens):
+    """Каждая оценка увеличивает счетчики котика и его породы"""
+    for user, rating in zip(users, (5, 5, 4, 1)):
+        rate(user, kittens[0], rating)
+    rate(users[0], kittens[2], 2)
+    rate(users[0], kittens[1], 3)
+
+    kittens[0].refresh_from_db()
+    assert kittens[0].rating_histogram == (1, 0, 0, 1, 2)
+    siamese, sphynx = Breed.objects.order_by("id")
+    assert siamese.rating_histogram == (1, 1, 0, 1, 2)
+    assert (siamese.rating_count, siamese.rating_sum) == (5, 17)
+    assert sphynx.rating_histogram == (0, 0, 1, 0, 0)
+    assert_consistent()
+
+
+@pytest.mark.django_db
+def test_kitten_detail_rating_stats(users, kittens, settings):
+    """Проверка распределения и байесовской оценки в карточке котика"""
+    settings.KITTENS_RATING_PRIOR_MEAN = 3.0
+    settings.KITTENS_RATING_PRIOR_WEIGHT = 2
+    rate(users[1], kittens[0], 5)
+    rate(users[2], kittens[0], 4)
+
+    response = APIClient().get(f"/api/{kittens[0].id}/")
+    assert response.data["rating_stats"] == {
+        "count": 2,
+        "average": 4.5,
+        "bayesian_average": 3.75,
+        "distribution": {"1": 0, "2": 0, "3": 0, "4": 1, "5": 1},
+    }
+
+    settings.KITTENS_FAST_SERIALIZATION = True
+    fast = APIClient().get(f"/api/{kittens[0].id}/", {"fast": 1})
+    assert fast.data["rating_stats"] == response.data["rating_stats"]
+
+
+@pytest.mark.django_db
+def test_breed_stats_endpoint(users, breeds, kittens):
+    """Проверка статистики оценок пород"""
+    rate(users[1], kittens[0], 5)
+    rate(users[1], kittens[2], 3)
+    rate(users[1], kittens[1], 1)
+
+    response = APIClient().get("/api/breeds/stats/")
+    assert response.status_code == status.HTTP_200_OK
+    results = {
+        breed["name"]: breed["rating_stats"] for breed in response.data["results"]
+    }
+    assert results["Сиамская"]["count"] == 2
+    assert results["Сиамская"]["average"] == 4.0
+    assert results["Сиамская"]["distribution"] == {
+        "1": 0,
+        "2": 0,
+        "3": 1,
+        "4": 0,
+        "5": 1,
+    }
+    assert results["Сфинкс"]["average"] == 1.0
+
+    # Новая оценка сбрасывает закешированную статистику
+    rate(users[2], kittens[1], 5)
+    response = APIClient().get("/api/breeds/stats/")
+    results = {
+        breed["name"]: breed["rating_stats"] for breed in response.data["results"]
+    }
+    assert results["Сфинкс"]["count"] == 2
+
+
+@pytest.mark.django_db
+def test_histograms_follow_updates_and_deletes(users, breeds, kittens):
+    """Гистограммы пород остаются точными при изменении и удалении данных"""
+    for user in users[1:]:
+        rate(user, kittens[0], 4)
+        rate(user, kittens[1], 2)
+    rating = Rating.objects.filter(kitten=kittens[0]).first()
+    rating.rating = 1
+    rating.save()
+    assert_consistent()
+
+    Rating.objects.filter(kitten=kittens[1], user=users[1]).delete()
+    assert_consistent()
+
+    Rating.objects.upsert(
+        [Rating(kitten=kittens[2], user=users[1], rating=5)]
+        + [Rating(kitten=kittens[0], user=user, rating=3) for user in users[2:]]
+    )
+    assert_consistent()
+
+    # Смена породы переносит оценки котика
+    kitten = Kitten.objects.get(pk=kittens[0].pk)
+    kitten.breed = breeds[1]
+    kitten.save()
+    assert_consistent()
+    # Изменение через API загружает котика без гистограммы
+    client = APIClient()
+    client.force_authenticate(user=users[0])
+    response = client.patch(f"/api/{kittens[2].pk}/", {"breed": breeds[1].id})
+    assert response.status_code == status.HTTP_200_OK
+    assert_consistent()
+
+    # Котик, загруженный до новой оценки, удаляется с текущей гистограммой
+    stale = Kitten.objects.get(pk=kittens[1].pk)
+    rate(users[3], kittens[1], 5)
+    stale.delete()
+    assert_consistent()
+
+    # Каскад от пользователя удаляет и котиков, и оценки других котиков
+    users[0].delete()
+    assert_consistent()
+    assert set(histograms(Breed).values()) == {(0, 0, 0, 0, 0)}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_compute_histograms(users, breeds, kittens, vectorized):
+    """Проверка подсчета гистограмм по полному чтению таблиц"""
+    if vectorized:
+        pytest.importorskip("numpy")
+    rate(users[1], kittens[0], 5)
+    rate(users[2], kittens[0], 3)
+    rate(users[1], kittens[1], 1)
+
+    kitten_histograms, breed_histograms = stats.compute_histograms(
+        vectorized=vectorized
+    )
+    assert kitten_histograms == histograms(Kitten)
+    assert breed_histograms == histograms(Breed)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("options", [[], ["--vectorized"]])
+def test_recompute_ratings_rebuilds_histograms(users, breeds, kittens, options):
+    """Проверка восстановления испорченных гистограмм котиков и пород"""
+    rate(users[1], kittens[0], 5)
+    rate(users[2], kittens[0], 2)
+    expected = histograms(Kitten), histograms(Breed)
+    Kitten.objects.update(stars_5=7, stars_2=0)
+    Breed.objects.update(rating_count=0, stars_1=3)
+
+    call_command("recompute_ratings", *options)
+
+    assert (histograms(Kitten), histograms(Breed)) == expected
+    assert_consistent()
@@ -0,0 +1,135 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import Client
+from django.urls import resolve
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from kittens import metrics, throttling
+from kittens.middleware import ConcurrencyLimitMiddleware
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Управляемое время для ведра токенов"""
+    now = [1000.0]
+    monkeypatch.setattr(throttling.time, "time", lambda: now[0])
+    return now
+
+
+def test_token_bucket_allows_burst_then_refills(clock):
+    """Ведро пропускает limit запросов подряд и пополняется равномерно"""
+    assert [throttling.take("bucket", 3, 60) for _ in range(3)] == [0, 0, 0]
+    assert throttling.take("bucket", 3, 60) == pytest.approx(20)
+    # Отклоненный запрос не расходует токен
+    assert throttling.take("bucket", 3, 60) == pytest.approx(20)
+    assert throttling.take("other", 3, 60) == 0
+
+    clock[0] += 20
+    assert throttling.take("bucket", 3, 60) == 0
+    assert throttling.take("bucket", 3, 60) == pytest.approx(20)
+
+    # После простоя ведро не копит больше limit токенов
+    clock[0] += 600
+    assert [throttling.take("bucket", 3, 60) for _ in range(4)][-1] > 0
+
+
+@pytest.mark.django_db
+def test_throttle_per_ip_and_per_user(settings):
+    """Анонимные клиенты ограничиваются по IP, авторизованные — по пользователю"""
+    settings.KITTENS_THROTTLE_RATES = {"kittens": "2/min"}
+    client = APIClient()
+    assert client.get("/api/").status_code == status.HTTP_200_OK
+    assert client.get("/api/").status_code == status.HTTP_200_OK
+    response = client.get("/api/")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response["Retry-After"] == "30"
+    assert metrics.THROTTLED.get_count(scope="kittens") == 1
+
+    assert client.get("/api/", REMOTE_ADDR="10.0.0.2").status_code == status.HTTP_200_OK
+    client.force_authenticate(User.objects.create_user(username="judge"))
+    assert client.get("/api/").status_code == status.HTTP_200_OK
+    # Представления без throttle_scope не ограничиваются
+    assert APIClient().get("/api/breeds/").status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_token_endpoint_throttled(settings):
+    """Подбор пароля упирается в лимит эндпоинта токенов"""
+    settings.KITTENS_THROTTLE_RATES = {"token": "1/min"}
+    client = APIClient()
+    credentials = {"username": "nobody", "password": "wrong"}
+    assert client.post("/api/token/", credentials).status_code == 401
+    response = client.post("/api/token/", credentials)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+
+@pytest.mark.django_db
+def test_async_views_throttled(settings):
+    """Async-эндпоинты делят лимит scope kittens по IP или пользователю JWT"""
+    settings.KITTENS_THROTTLE_RATES = {"kittens": "2/min"}
+    client = Client()
+    assert client.get("/api/async/").status_code == status.HTTP_200_OK
+    assert client.get("/api/async/breeds/").status_code == status.HTTP_200_OK
+    response = client.get("/api/async/1/")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response["Retry-After"] == "30"
+    assert response.json()["detail"].startswith("Request was throttled")
+    assert metrics.THROTTLED.get_count(scope="kittens") == 1
+
+    token = AccessToken.for_user(User.objects.create_user(username="judge"))
+    response = client.get("/api/async/", HTTP_AUTHORIZATION=f"Bearer {token}")
+    assert response.status_code == status.HTTP_200_OK
+
+
+def get_request(rf, path):
+    request = rf.get(path)
+    request.resolver_match = resolve(path)
+    return request
+
+
+def test_concurrency_limit_sheds_load(settings, rf):
+    """Запрос сверх лимита одновременных получает 503, метрики доступны"""
+    settings.KITTENS_MAX_CONCURRENT_REQUESTS = 1
+    inner = []
+
+    def get_response(request):
+        # Второй запрос приходит, пока первый занимает единственный слот
+        for path in ("/api/", "/api/metrics/"):
+            inner.append(middleware.process_view(get_request(rf, path), None, (), {}))
+        return HttpResponse()
+
+    middleware = ConcurrencyLimitMiddleware(get_response)
+    request = get_request(rf, "/api/")
+    assert middleware.process_view(request, None, (), {}) is None
+    middleware(request)
+
+    shed, exempt = inner
+    assert shed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert shed["Retry-After"] == "1"
+    assert exempt is None
+    assert metrics.SHED.get_count(view="kitten_list_create") == 1
+    # Слот освобождается после ответа
+    assert middleware.process_view(get_request(rf, "/api/"), None, (), {}) is None
+
+
+@pytest.mark.django_db
+def test_concurrency_limit_releases_slots(settings):
+    """Последовательные запросы не исчерпывают слоты"""
+    settings.KITTENS_MAX_CONCURRENT_REQUESTS = 1
+    client = Client()
+    for _ in range(3):
+        assert client.get("/api/").status_code == status.HTTP_200_OK
+    assert client.get("/api/missing/").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/api/").status_code == status.HTTP_200_OK
@@ -1,18 +1,19 @@
+import base64
+from urllib.parse import urlencode
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
-from rest_framework.test import APIClient
 
-from kittens.models import Breed, Kitten
+from kittens.models import Breed, Kitten, Rating
+from kittens.pagination import KittenCursorPagination
 
 User = get_user_model()
 
 
-@pytest.fixture
-def api_client():
-    return APIClient()
-
-
 @pytest.fixture
 def superuser(api_client):
     user = User.objects.create_superuser(username="admin", password="password")
@@ -27,11 +28,6 @@ def regular_user(api_client):
     return user, api_client
 
 
-@pytest.fixture
-def breed():
-    return Breed.objects.create(name="Сиамская")
-
-
 @pytest.fixture
 def kitten(regular_user, breed):
     user, _ = regular_user
@@ -141,3 +137,260 @@ def test_kitten_detail_update_destroy_view(regular_user, kitten, api_client):
 
     response = api_client.get(f"/api/{kitten.id}/")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_rating_create_updates_kitten_average(regular_user, kitten, api_client):
+    """Проверка обновления среднего рейтинга котенка при оценке"""
+    response = api_client.get(f"/api/{kitten.id}/")
+    assert response.data["average_rating"] is None
+
+    response = api_client.post(f"/api/{kitten.id}/rate/", {"rating": 5})
+    assert response.status_code == status.HTTP_201_CREATED
+    # Повторная оценка заменяет прежнюю
+    response = api_client.post(f"/api/{kitten.id}/rate/", {"rating": 4})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["rating"] == 4
+    other_user = User.objects.create_user(username="other", password="password")
+    Rating.objects.create(kitten=kitten, user=other_user, rating=1)
+
+    kitten.refresh_from_db()
+    assert kitten.rating_count == 2
+    assert kitten.rating_sum == 5
+    response = api_client.get("/api/")
+    assert response.data["results"][0]["average_rating"] == 2.5
+
+
+@pytest.mark.django_db
+def test_rating_delete_updates_kitten_average(regular_user, kitten):
+    """Проверка пересчета среднего рейтинга котенка при удалении оценки"""
+    user, _ = regular_user
+    other_user = User.objects.create_user(username="other", password="password")
+    Rating.objects.create(kitten=kitten, user=user, rating=5)
+    rating = Rating.objects.create(kitten=kitten, user=other_user, rating=2)
+
+    rating.delete()
+
+    kitten.refresh_from_db()
+    assert kitten.rating_count == 1
+    assert kitten.rating_sum == 5
+    assert kitten.average_rating == 5.0
+
+
+@pytest.mark.django_db
+def test_kitten_list_cursor_pagination(regular_user, breed, api_client):
+    """Проверка курсорной пагинации списка котиков"""
+    user, _ = regular_user
+    Kitten.objects.bulk_create(
+        Kitten(breed=breed, color="Серый", age=age, description="Кот", owner=user)
+        for age in (7, 3, 5, 1, 9, 3, 3, 1)
+    )
+    expected = list(Kitten.objects.order_by("age", "id").values_list("age", "id"))
+
+    response = api_client.get(
+        "/api/", {"pagination": "cursor", "cursor_ordering": "age", "page_size": 2}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert "count" not in response.data
+
+    pages = []
+    while True:
+        pages.append([(k["age"], k["id"]) for k in response.data["results"]])
+        if not response.data["next"]:
+            break
+        response = api_client.get(response.data["next"])
+    assert sum(pages, []) == expected
+
+    # Обратно по ссылкам previous страницы возвращаются без пропусков
+    while response.data["previous"]:
+        response = api_client.get(response.data["previous"])
+        pages.pop()
+        assert [(k["age"], k["id"]) for k in response.data["results"]] == pages[-1]
+
+
+@pytest.mark.django_db
+def test_kitten_list_cursor_uses_keyset(regular_user, breed, api_client):
+    """Страница внутри одинаковых значений сортировки читается без OFFSET"""
+    user, _ = regular_user
+    Kitten.objects.bulk_create(
+        Kitten(breed=breed, color="Серый", age=1, description="Кот", owner=user)
+        for _ in range(6)
+    )
+    params = {"pagination": "cursor", "cursor_ordering": "age", "page_size": 2}
+    url = api_client.get("/api/", params).data["next"]
+    with CaptureQueriesContext(connection) as captured:
+        api_client.get(url)
+    assert not any("OFFSET" in query["sql"] for query in captured)
+    ordering = KittenCursorPagination.orderings["age"]
+    plan = (
+        Kitten.objects.filter(
+            KittenCursorPagination().keyset_filter(ordering, "[1, 3]")
+        )
+        .order_by(*ordering)[:3]
+        .explain()
+    )
+    assert "kittens_kit_age_33a416_idx" in plan
+    assert "TEMP B-TREE" not in plan
+
+    for position in (
+        "abc",
+        '["x", "y"]',
+        '[{"a": 1}]',
+        "[null]",
+        "[1, NaN]",
+        "[1e30, 1]",
+    ):
+        cursor = base64.b64encode(urlencode({"p": position}).encode()).decode()
+        response = api_client.get("/api/", {**params, "cursor": cursor})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_kitten_list_cursor_max_page_size(regular_user, breed, api_client, monkeypatch):
+    """Проверка ограничения размера страницы курсорной пагинации"""
+    monkeypatch.setattr(KittenCursorPagination, "max_page_size", 10)
+    user, _ = regular_user
+    Kitten.objects.bulk_create(
+        Kitten(breed=breed, color="Серый", age=1, description="Кот", owner=user)
+        for _ in range(12)
+    )
+
+    response = api_client.get("/api/", {"pagination": "cursor", "page_size": 1000})
+    assert len(response.data["results"]) == 10
+    response = api_client.get("/api/", {"pagination": "cursor", "page_size": 3})
+    assert len(response.data["results"]) == 3
+
+
+@pytest.mark.django_db
+def test_kitten_bulk_create_view(
+    regular_user, breed, api_client, django_assert_num_queries
+):
+    """Проверка массового создания котиков"""
+    other_breed = Breed.objects.create(name="Британская")
+    kittens_data = [
+        {"breed": breed.id, "color": "Серый", "age": 2, "description": "Кот"},
+        {"breed": other_breed.id, "color": "Белый", "age": 3, "description": "Кот"},
+    ] * 10
+
+    # SAVEPOINT, SELECT пород, INSERT, индекс поиска, RELEASE
+    with django_assert_num_queries(5):
+        response = api_client.post("/api/bulk/", kittens_data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(response.data) == 20
+    assert response.data[1]["breed"] == other_breed.id
+    assert Kitten.objects.filter(owner=regular_user[0]).count() == 20
+
+
+@pytest.mark.django_db
+def test_kitten_bulk_create_view_errors(regular_user, breed, api_client):
+    """Проверка ошибок по элементам при массовом создании котиков"""
+    kittens_data = [
+        {"breed": breed.id, "color": "Серый", "age": 2, "description": "Кот"},
+        {"breed": 999, "color": "Белый", "age": 3, "description": "Кот"},
+        {"breed": breed.id, "color": "", "age": 0, "description": "Кот"},
+    ]
+
+    response = api_client.post("/api/bulk/", kittens_data, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data[0] == {}
+    assert "breed" in response.data[1]
+    assert set(response.data[2]) == {"color", "age"}
+    assert not Kitten.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rating_bulk_upsert_view(
+    regular_user, kitten, breed, api_client, django_assert_num_queries
+):
+    """Проверка пакетной оценки котиков с обновлением повторных оценок"""
+    user, _ = regular_user
+    other_kitten = Kitten.objects.create(
+        breed=breed, color="Белый", age=2, description="Кот", owner=user
+    )
+    Rating.objects.create(kitten=kitten, user=user, rating=1)
+
+    ratings_data = [
+        {"kitten": kitten.id, "rating": 5},
+        {"kitten": other_kitten.id, "rating": 3},
+    ]
+    # SAVEPOINT, SELECT котиков, INSERT ... ON CONFLICT, блокировка котиков,
+    # гистограммы пород до и после UPDATE агрегатов, UPDATE породы, RELEASE
+    with django_assert_num_queries(9):
+        response = api_client.post("/api/rate/", ratings_data, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data == [
+        {"kitten": kitten.id, "user": "testuser", "rating": 5},
+        {"kitten": other_kitten.id, "user": "testuser", "rating": 3},
+    ]
+
+    assert Rating.objects.get(kitten=kitten, user=user).rating == 5
+    kitten.refresh_from_db()
+    assert (kitten.rating_count, kitten.rating_sum, kitten.average_rating) == (
+        1,
+        5,
+        5.0,
+    )
+    other_kitten.refresh_from_db()
+    assert other_kitten.average_rating == 3.0
+
+
+@pytest.mark.django_db
+def test_rating_bulk_upsert_view_errors(regular_user, kitten, api_client):
+    """Проверка ошибок пакетной оценки котиков"""
+    ratings_data = [
+        {"kitten": kitten.id, "rating": 6},
+        {"kitten": 999, "rating": 3},
+        {"kitten": 10**30, "rating": 3},
+    ]
+
+    response = api_client.post("/api/rate/", ratings_data, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "rating" in response.data[0]
+    assert "kitten" in response.data[1]
+    assert "kitten" in response.data[2]
+    assert not Rating.objects.exists()
+
+
+@pytest.mark.django_db
+def test_kitten_leaderboard_view(regular_user, breed, api_client):
+    """Проверка рейтинга лучших котиков, общего и по породе"""
+    user, _ = regular_user
+    other_breed = Breed.objects.create(name="Британская")
+    kittens = Kitten.objects.bulk_create(
+        Kitten(breed=kitten_breed, color="Серый", age=1, description="Кот", owner=user)
+        for kitten_breed in (breed, other_breed, breed, other_breed)
+    )
+    for kitten, rating in zip(kittens, (3, 5, 4)):
+        Rating.objects.create(kitten=kitten, user=user, rating=rating)
+
+    response = api_client.get("/api/top/")
+    assert response.status_code == status.HTTP_200_OK
+    assert [kitten["id"] for kitten in response.data] == [
+        kittens[1].id,
+        kittens[2].id,
+        kittens[0].id,
+    ]
+
+    response = api_client.get("/api/top/", {"breed": breed.id, "limit": 1})
+    assert [kitten["id"] for kitten in response.data] == [kittens[2].id]
+
+    response = api_client.get("/api/top/", {"limit": 1000})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    response = api_client.get("/api/top/", {"breed": 10**30})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "breed" in response.data
+
+
+@pytest.mark.django_db
+def test_kitten_views_fast_serialization(regular_user, kitten, api_client, settings):
+    """Проверка быстрого режима сериализации списка и карточки котика"""
+    user, _ = regular_user
+    Rating.objects.create(kitten=kitten, user=user, rating=3)
+    expected_list = api_client.get("/api/", {"pagination": "cursor"}).content
+    expected_detail = api_client.get(f"/api/{kitten.id}/").content
+
+    settings.KITTENS_FAST_SERIALIZATION = True
+    cache.clear()
+    assert api_client.get("/api/", {"pagination": "cursor"}).content == expected_list
+    assert api_client.get(f"/api/{kitten.id}/").content == expected_detail
@@ -0,0 +1,116 @@
+import threading
+import time
+from math import ceil
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+from kittens import metrics
+
+# GCRA в Redis: одна команда на запрос, время берется у сервера Redis,
+# чтобы часы процессов приложения не влияли на лимит
+GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local allow_at = tat + interval - period
+if allow_at > now then
+    return tostring(allow_at - now)
+end
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil((tat + interval - now) * 1000))
+return '0'
+"""
+
+# Блокировки по хешу ключа: клиенты не ждут друг друга
+_locks = [threading.Lock() for _ in range(64)]
+_scripts = {}
+
+
+def parse_rate(rate):
+    """'120/min' -> (120, 60)"""
+    count, period = rate.split("/")
+    return int(count), {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+
+
+def take(key, limit, period):
+    """Берет токен из ведра ключа по алгоритму GCRA
+
+    Ведро на limit запросов пополняется на один токен каждые period / limit
+    секунд. В кеше хранится одно число — теоретическое время прихода
+    следующего запроса, поэтому проверка стоит O(1) при любом лимите.
+    Возвращает 0, если запрос разрешен, иначе секунды до появления токена.
+    """
+    backend = caches[settings.KITTENS_THROTTLE_CACHE_ALIAS]
+    interval = period / limit
+    if isinstance(backend, RedisCache):
+        return _take_redis(backend, key, interval, period)
+
+    # Без Redis чтение и запись ключа защищает блокировка внутри процесса
+    with _locks[hash(key) % len(_locks)]:
+        now = time.time()
+        tat = max(backend.get(key, now), now)
+        allow_at = tat + interval - period
+        if allow_at > now:
+            return allow_at - now
+        backend.set(key, tat + interval, ceil(tat + interval - now))
+        return 0
+
+
+def _take_redis(backend, key, interval, period):
+    client = backend._cache.get_client(key, write=True)
+    alias = settings.KITTENS_THROTTLE_CACHE_ALIAS
+    if alias not in _scripts:
+        # Script выполняет EVALSHA и сам загружает скрипт после перезапуска Redis
+        _scripts[alias] = client.register_script(GCRA_SCRIPT)
+    script = _scripts[alias]
+    wait = script(
+        keys=[backend.make_and_validate_key(key)],
+        args=[interval, period],
+        client=client,
+    )
+    return float(wait)
+
+
+def take_scope(scope, ident):
+    """Берет токен ведра scope для клиента ident
+
+    Возвращает 0, если запрос разрешен или у scope нет лимита, иначе
+    секунды до появления токена.
+    """
+    rate = settings.KITTENS_THROTTLE_RATES.get(scope)
+    if rate is None:
+        return 0
+    wait = take(f"kittens:throttle:{scope}:{ident}", *parse_rate(rate))
+    if wait:
+        metrics.THROTTLED.inc(scope=scope)
+    return wait
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов по throttle_scope представления
+
+    Лимит берется из KITTENS_THROTTLE_RATES; ключ — пользователь, а для
+    анонимных запросов — IP-адрес. Представления без throttle_scope
+    не ограничиваются.
+    """
+
+    scope_attr = "throttle_scope"
+
+    def allow_request(self, request, view):
+        scope = getattr(view, self.scope_attr, None)
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        self.wait_seconds = take_scope(scope, ident) or None
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
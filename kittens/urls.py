@@ -1,15 +1,30 @@
 from django.urls import path
 
-from kittens.views import (BreedListView, KittenDetailUpdateDestroyView,
-                           KittenListCreateView, RatingCreateView)
+from kittens import async_views
+from kittens.views import (BreedListView, BreedStatsView, CacheStatsView,
+                           KittenBulkCreateView, KittenDetailUpdateDestroyView,
+                           KittenExportView, KittenLeaderboardView,
+                           KittenListCreateView, MetricsView,
+                           RatingBulkUpsertView, RatingCreateView)
 
 urlpatterns = [
     path("", KittenListCreateView.as_view(), name="kitten_list_create"),
+    path("bulk/", KittenBulkCreateView.as_view(), name="kitten_bulk_create"),
+    path("export/", KittenExportView.as_view(), name="kitten_export"),
+    path("top/", KittenLeaderboardView.as_view(), name="kitten_leaderboard"),
     path(
         "<int:pk>/",
         KittenDetailUpdateDestroyView.as_view(),
         name="kitten_detail_update_delete",
     ),
     path("<int:pk>/rate/", RatingCreateView.as_view(), name="kitten_rate"),
+    path("rate/", RatingBulkUpsertView.as_view(), name="kitten_bulk_rate"),
     path("breeds/", BreedListView.as_view(), name="breed_list_create"),
+    path("breeds/stats/", BreedStatsView.as_view(), name="breed_stats"),
+    path("cache/stats/", CacheStatsView.as_view(), name="cache_stats"),
+    path("metrics/", MetricsView.as_view(), name="metrics"),
+    # Сокращенные async-версии чтения для замеров под ASGI, не замена /api/
+    path("async/", async_views.kitten_list, name="async_kitten_list"),
+    path("async/<int:pk>/", async_views.kitten_detail, name="async_kitten_detail"),
+    path("async/breeds/", async_views.breed_list, name="async_breed_list"),
 ]
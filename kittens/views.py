@@ -1,17 +1,51 @@
-from django.db.models import Avg
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, extend_schema_view
-from rest_framework.generics import (CreateAPIView, ListCreateAPIView,
+from rest_framework import status
+from rest_framework.generics import (CreateAPIView, GenericAPIView,
+                                     ListAPIView, ListCreateAPIView,
                                      RetrieveUpdateDestroyAPIView,
                                      get_object_or_404)
-from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
-from kittens.models import Breed, Kitten, Rating
-from kittens.permissions import IsAuthorOrReadOnly
-from kittens.serializers import (BreedSerializer, KittenCreateUpdateSerializer,
-                                 KittenDetailSerializer, KittenSerializer,
-                                 RatingSerializer)
+from kittens import breeds, cache, conditional, ingestion, metrics, search
+from kittens.filters import KittenFilter, KittenSearchFilter
+from kittens.models import STAR_FIELDS, Breed, Kitten, Rating
+from kittens.pagination import KittenCursorPagination
+from kittens.permissions import HasMetricsToken, IsAuthorOrReadOnly
+from kittens.renderers import CSVRenderer, NDJSONRenderer, PrometheusRenderer
+from kittens.serializers import (BreedSerializer, BreedStatsSerializer,
+                                 ClaimsTokenObtainPairSerializer,
+                                 KittenBulkCreateSerializer,
+                                 KittenCreateUpdateSerializer,
+                                 KittenDetailRowSerializer,
+                                 KittenDetailSerializer, KittenRowSerializer,
+                                 KittenSerializer, LeaderboardQuerySerializer,
+                                 RatingBulkSerializer, RatingSerializer)
+
+# Колонки, которые нужны сериализаторам котиков для чтения; название
+# породы берется из справочника пород процесса
+KITTEN_LIST_FIELDS = (
+    "id",
+    "breed_id",
+    "color",
+    "age",
+    "description",
+    "owner__username",
+    "rating_count",
+    "average_rating",
+)
+# Карточка котика дополнительно выводит статистику оценок
+KITTEN_DETAIL_FIELDS = (*KITTEN_LIST_FIELDS, "rating_sum", *STAR_FIELDS)
 
 
 @extend_schema_view(
@@ -27,9 +61,22 @@ from kittens.serializers import (BreedSerializer, KittenCreateUpdateSerializer,
         description="Создает новую породу котика и возвращает ее данные. Доступно только администраторам.",
     ),
 )
-class BreedListView(ListCreateAPIView):
+@conditional.conditional_get(
+    conditional.breed_list_etag, conditional.breed_list_last_modified
+)
+class BreedListView(cache.CachedResponseMixin, ListCreateAPIView):
     queryset = Breed.objects.all()
     serializer_class = BreedSerializer
+    cache_namespace = cache.BREEDS
+
+    def get_queryset(self):
+        # Список пород отдается из справочника процесса без запросов к БД
+        if self.request.method == "GET":
+            return list(breeds.get_breeds().values())
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -37,11 +84,41 @@ class BreedListView(ListCreateAPIView):
         return []
 
 
+@extend_schema_view(
+    get=extend_schema(
+        tags=["Breeds"],
+        summary="Статистика оценок пород",
+        description=(
+            "Возвращает для каждой породы число оценок ее котиков, среднюю и "
+            "байесовскую среднюю оценку и распределение оценок от 1 до 5."
+        ),
+    ),
+)
+class BreedStatsView(cache.CachedResponseMixin, ListAPIView):
+    queryset = Breed.objects.all()
+    serializer_class = BreedStatsSerializer
+    permission_classes = []
+    # Статистика меняется вместе с оценками котиков
+    cache_namespace = cache.KITTENS
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
 @extend_schema_view(
     get=extend_schema(
         tags=["Kittens"],
         summary="Получение списка котиков",
-        description="Возвращает список всех котиков, фильтрация по породе, пагинация.",
+        description=(
+            "Возвращает список всех котиков, пагинация. Фильтры: breed, breed__in "
+            "и color__in (значения через запятую), age__gte, age__lte, min_rating; "
+            "сортировка ordering=id|age|average_rating (с минусом по убыванию). "
+            "Параметр search ищет по словам в описании и цвете с учетом "
+            "словоформ и сортирует по релевантности. "
+            "С параметром pagination=cursor используется курсорная пагинация "
+            "(сортировка cursor_ordering=id|age|-average_rating, размер страницы "
+            "page_size)."
+        ),
         responses=KittenSerializer(many=True),
     ),
     post=extend_schema(
@@ -52,15 +129,39 @@ class BreedListView(ListCreateAPIView):
         responses=KittenSerializer,
     ),
 )
-class KittenListCreateView(ListCreateAPIView):
-    queryset = Kitten.objects.annotate(
-        average_rating=Avg("rating_kitten__rating")
-    ).select_related("breed", "owner").prefetch_related("rating_kitten").order_by("id")
-    filterset_fields = ["breed"]
+@conditional.conditional_get(
+    conditional.kitten_list_etag, conditional.kitten_list_last_modified
+)
+class KittenListCreateView(cache.CachedResponseMixin, ListCreateAPIView):
+    queryset = (
+        Kitten.objects.select_related("owner").only(*KITTEN_LIST_FIELDS).order_by("id")
+    )
+    filterset_class = KittenFilter
+    # Поиск сортирует по релевантности, явный параметр ordering применяется позже
+    filter_backends = [KittenSearchFilter, *api_settings.DEFAULT_FILTER_BACKENDS]
+    throttle_scope = "kittens"
+    cache_namespace = cache.KITTENS
+
+    @property
+    def pagination_class(self):
+        if self.request.query_params.get("pagination") == "cursor":
+            return KittenCursorPagination
+        return api_settings.DEFAULT_PAGINATION_CLASS
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == "GET" and settings.KITTENS_FAST_SERIALIZATION:
+            return queryset.values(*KittenRowSerializer.fields)
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == "POST":
             return KittenCreateUpdateSerializer
+        if settings.KITTENS_FAST_SERIALIZATION:
+            return KittenRowSerializer
         return KittenSerializer
 
     def get_permissions(self):
@@ -69,7 +170,136 @@ class KittenListCreateView(ListCreateAPIView):
         return []
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.pk)
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=["Kittens"],
+        summary="Рейтинг лучших котиков",
+        description=(
+            "Возвращает limit котиков с наибольшим средним рейтингом, "
+            "всех или одной породы (breed)."
+        ),
+        parameters=[LeaderboardQuerySerializer],
+    ),
+)
+@conditional.conditional_get(
+    conditional.kitten_list_etag, conditional.kitten_list_last_modified
+)
+class KittenLeaderboardView(cache.CachedResponseMixin, ListAPIView):
+    serializer_class = KittenSerializer
+    pagination_class = None
+    permission_classes = []
+    throttle_scope = "kittens"
+    cache_namespace = cache.KITTENS
+
+    def get_queryset(self):
+        params = LeaderboardQuerySerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        # Сортировка совпадает с индексами по среднему рейтингу, поэтому
+        # запрос читает из индекса только limit строк
+        queryset = (
+            Kitten.objects.select_related("owner")
+            .only(*KITTEN_LIST_FIELDS)
+            .filter(rating_count__gt=0)
+            .order_by("-average_rating", "id")
+        )
+        if "breed" in params.validated_data:
+            queryset = queryset.filter(breed_id=params.validated_data["breed"])
+        return queryset[: params.validated_data["limit"]]
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+@extend_schema_view(
+    post=extend_schema(
+        tags=["Kittens"],
+        summary="Массовое создание котиков",
+        description=(
+            "Создает котиков из JSON-массива в одной транзакции. При ошибках "
+            "ничего не создается, ошибки возвращаются по каждому элементу. "
+            "Требуется авторизация."
+        ),
+    ),
+)
+class KittenBulkCreateView(CreateAPIView):
+    queryset = Kitten.objects.all()
+    serializer_class = KittenBulkCreateSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "kittens"
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(many=True, max_length=settings.KITTENS_BULK_MAX_ITEMS)
+        return super().get_serializer(*args, **kwargs)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        kittens = serializer.save(owner_id=self.request.user.pk)
+        # bulk_create не отправляет сигналы, поэтому индекс поиска
+        # и кеш обновляются явно
+        search.index_kittens(kittens)
+        cache.bump_version_on_commit(cache.KITTENS)
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=["Kittens"],
+        summary="Выгрузка всех котиков",
+        description=(
+            "Потоково выгружает всех котиков в формате NDJSON (format=ndjson) "
+            "или CSV (format=csv), с теми же фильтрами, что и список котиков."
+        ),
+        responses={(200, "application/x-ndjson"): str, (200, "text/csv"): str},
+    ),
+)
+class KittenExportView(GenericAPIView):
+    queryset = Kitten.objects.order_by("id")
+    filterset_class = KittenFilter
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    pagination_class = None
+    permission_classes = []
+    throttle_scope = "kittens"
+
+    def get(self, request, *args, **kwargs):
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values(*KITTEN_LIST_FIELDS)
+            .iterator(chunk_size=settings.KITTENS_EXPORT_CHUNK_SIZE)
+        )
+        renderer = request.accepted_renderer
+        # Один снимок справочника пород на всю выгрузку
+        catalog = breeds.get_breeds()
+        return StreamingHttpResponse(
+            self.stream(renderer, (self.export_row(row, catalog) for row in rows)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+
+    @staticmethod
+    def export_row(row, catalog):
+        breed = catalog.get(row["breed_id"]) or breeds.get_breed(row["breed_id"])
+        return {
+            "id": row["id"],
+            "breed": breed.name if breed else None,
+            "color": row["color"],
+            "age": row["age"],
+            "description": row["description"],
+            "owner": row["owner__username"],
+            "average_rating": row["average_rating"] if row["rating_count"] else None,
+        }
+
+    @staticmethod
+    def stream(renderer, rows):
+        # Строки отдаются пачками, чтобы не писать в сокет по одной строке
+        batch = []
+        for line in renderer.stream(rows):
+            batch.append(line)
+            if len(batch) >= settings.KITTENS_EXPORT_CHUNK_SIZE:
+                yield "".join(batch)
+                batch = []
+        if batch:
+            yield "".join(batch)
 
 
 @extend_schema_view(
@@ -77,6 +307,7 @@ class KittenListCreateView(ListCreateAPIView):
         tags=["Kittens {id}"],
         summary="Получение одного котика",
         description="Возвращает данные одного котика.",
+        responses=KittenDetailSerializer,
     ),
     put=extend_schema(
         tags=["Kittens {id}"],
@@ -94,33 +325,105 @@ class KittenListCreateView(ListCreateAPIView):
         description="Удаляет котика. Требуется авторизация (только автор или администратор).",
     ),
 )
-class KittenDetailUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    queryset = Kitten.objects.annotate(
-        average_rating=Avg("rating_kitten__rating")
-    ).select_related("breed", "owner").prefetch_related("rating_kitten")
+@conditional.conditional_get(
+    conditional.kitten_detail_etag, conditional.kitten_detail_last_modified
+)
+class KittenDetailUpdateDestroyView(
+    cache.CachedResponseMixin, RetrieveUpdateDestroyAPIView
+):
+    queryset = (
+        Kitten.objects.select_related("owner")
+        .only(*KITTEN_DETAIL_FIELDS)
+        .prefetch_related(
+            Prefetch(
+                "rating_kitten",
+                queryset=Rating.objects.select_related("user").only(
+                    "kitten_id", "rating", "user__username"
+                ),
+            )
+        )
+    )
     permission_classes = [IsAuthorOrReadOnly]
+    throttle_scope = "kittens"
+    # Карточка выводит название породы, а ее переименование не меняет котика
+    cache_dependencies = (cache.BREEDS,)
+
+    def get_queryset(self):
+        # Гистограмму котика при удалении перечитывает сигнал под блокировкой
+        if self.request.method == "DELETE":
+            return Kitten.objects.only("id", "owner", "breed")
+        # Изменение загружает только поля сериализатора: денормализованные
+        # счетчики оценок не записываются обратно из устаревшего экземпляра
+        if self.request.method not in SAFE_METHODS:
+            return Kitten.objects.only(
+                "id", "owner", *KittenCreateUpdateSerializer.Meta.fields
+            )
+        if settings.KITTENS_FAST_SERIALIZATION:
+            return Kitten.objects.values(*KittenDetailRowSerializer.fields)
+        return super().get_queryset()
 
     def get_serializer_class(self):
-        if self.request.method == "GET":
-            return KittenDetailSerializer
-        return KittenCreateUpdateSerializer
+        if self.request.method != "GET":
+            return KittenCreateUpdateSerializer
+        if settings.KITTENS_FAST_SERIALIZATION:
+            return KittenDetailRowSerializer
+        return KittenDetailSerializer
+
+    def get_cache_namespace(self):
+        return cache.kitten_namespace(self.kwargs["pk"])
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
 
 
 @extend_schema_view(
     post=extend_schema(
         tags=["Ratings {id}"],
         summary="Добавление рейтинга котику",
-        description="Добавляет рейтинг котику. Требуется авторизация.",
+        description=(
+            "Добавляет рейтинг котику или заменяет прежнюю оценку "
+            "пользователя. Требуется авторизация. В режиме "
+            "буферизованного приема (KITTENS_RATING_INGESTION) отвечает 202: "
+            "оценка записана в журнал и попадет в базу со следующей пачкой."
+        ),
     ),
 )
 class RatingCreateView(CreateAPIView):
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
     permission_classes = [IsAuthenticated]
+    throttle_scope = "ratings"
+
+    def create(self, request, *args, **kwargs):
+        if not settings.KITTENS_RATING_INGESTION:
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Проверка котика по индексу вместо загрузки строки и транзакции записи
+        if not Kitten.objects.filter(id=self.kwargs["pk"]).exists():
+            raise Http404
+        rating = Rating(
+            kitten_id=self.kwargs["pk"],
+            user_id=request.user.pk,
+            rating=serializer.validated_data["rating"],
+        )
+        ingestion.get_buffer().add(rating.kitten_id, rating.user_id, rating.rating)
+        return Response(
+            self.get_serializer(rating).data, status=status.HTTP_202_ACCEPTED
+        )
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        kitten = get_object_or_404(Kitten, id=self.kwargs["pk"])
-        serializer.save(user=self.request.user, kitten=kitten)
+        # Блокировка котика не дает двум запросам пользователя вставить
+        # оценку одновременно; счетчики котика все равно обновляются под ней
+        kitten = get_object_or_404(
+            Kitten.objects.select_for_update(), id=self.kwargs["pk"]
+        )
+        # Повторная оценка заменяет прежнюю, как в пакетной записи и буфере
+        serializer.instance = Rating.objects.filter(
+            kitten=kitten, user_id=self.request.user.pk
+        ).first()
+        serializer.save(user_id=self.request.user.pk, kitten=kitten)
 
     def get_permissions(self):
         if self.request.method == "POST":
@@ -128,6 +431,65 @@ class RatingCreateView(CreateAPIView):
         return []
 
 
+@extend_schema_view(
+    post=extend_schema(
+        tags=["Ratings {id}"],
+        summary="Пакетная оценка котиков",
+        operation_id="rate_bulk_create",
+        description=(
+            "Создает или обновляет оценки текущего пользователя для массива "
+            "котиков в одной транзакции. Требуется авторизация."
+        ),
+    ),
+)
+class RatingBulkUpsertView(CreateAPIView):
+    queryset = Rating.objects.all()
+    serializer_class = RatingBulkSerializer
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "ratings"
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.update(many=True, max_length=settings.KITTENS_BULK_MAX_ITEMS)
+        return super().get_serializer(*args, **kwargs)
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        ratings = serializer.save(user_id=self.request.user.pk)
+        # bulk_create не отправляет сигналы, поэтому кеш сбрасывается явно
+        cache.bump_version_on_commit(
+            cache.KITTENS,
+            *{cache.kitten_namespace(rating.kitten_id) for rating in ratings},
+        )
+
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=["Monitoring"],
+        summary="Статистика кеша ответов",
+        description="Возвращает счетчики попаданий и промахов кеша. Доступно только администраторам.",
+        responses=OpenApiTypes.OBJECT,
+    ),
+)
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache.get_stats())
+
+
+@extend_schema(exclude=True)
+class MetricsView(APIView):
+    """Метрики производительности процесса для Prometheus"""
+
+    # Сборщик метрик передает свой токен, а не JWT пользователя
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.render())
+
+
 @extend_schema_view(
     post=extend_schema(
         tags=["Authentication (JWT)"],
@@ -136,7 +498,8 @@ class RatingCreateView(CreateAPIView):
     ),
 )
 class CustomTokenObtainPairView(TokenObtainPairView):
-    pass
+    serializer_class = ClaimsTokenObtainPairSerializer
+    throttle_scope = "token"
 
 
 @extend_schema_view(
@@ -147,4 +510,4 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     ),
 )
 class CustomTokenRefreshView(TokenRefreshView):
-    pass
+    throttle_scope = "token"